@@ -385,6 +385,7 @@ class MinimalAdapter:
         # 統一屬性存取路徑（一次查找，永久使用）
         if hasattr(solver, 'rho'):
             # 基礎LBM求解器路徑
+            self._fluid = solver
             self.rho = solver.rho
             self.u = solver.u
             self.solid = solver.solid
@@ -394,12 +395,11 @@ class MinimalAdapter:
             self.body_force = getattr(solver, 'body_force', None)
             self.boundary_manager = getattr(solver, 'boundary_manager', None)
             self.phase = getattr(solver, 'phase', None)
-            self.f = getattr(solver, 'f', None)
-            self.f_new = getattr(solver, 'f_new', None)
             self.multiphase = getattr(solver, 'multiphase', None)
         else:
             # 熱耦合求解器路徑
             fs = getattr(solver, 'fluid_solver', solver)  # 使用getattr避免AttributeError
+            self._fluid = fs
             self.rho = getattr(fs, 'rho', None)
             self.u = getattr(fs, 'u', None)
             self.solid = getattr(fs, 'solid', None)
@@ -409,10 +409,17 @@ class MinimalAdapter:
             self.body_force = getattr(fs, 'body_force', None)
             self.boundary_manager = getattr(fs, 'boundary_manager', None)
             self.phase = getattr(fs, 'phase', None)
-            self.f = getattr(fs, 'f', None)
-            self.f_new = getattr(fs, 'f_new', None)
             self.multiphase = getattr(fs, 'multiphase', None)
     
+    # 分布函數不可快取：求解器每步以參考交換 f/f_new
+    @property
+    def f(self):
+        return getattr(self._fluid, 'f', None)
+    
+    @property
+    def f_new(self):
+        return getattr(self._fluid, 'f_new', None)
+    
     # 關鍵方法的直接引用（避免__getattr__開銷）
     def step(self):
         if hasattr(self._solver, 'step_ultra_optimized'):
@@ -700,6 +707,11 @@ class CoffeeSimulation:
         """同步SoA速度場到向量場"""
         import taichi as ti
         
+        # 向量速度場求解器（無SoA分量）：直接複製
+        if self.lbm.ux is None and self.lbm.u is not None:
+            self.u_vector.copy_from(self.lbm.u)
+            return
+        
         @ti.kernel
         def sync_kernel():
             for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
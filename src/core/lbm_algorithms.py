@@ -151,16 +151,22 @@ class SoAAdapter:
 # D3Q19統一算法實現
 # ===========================================
 
+# D3Q19常數 - 編譯期Python元組，於ti.static展開的迴圈中成為立即數 (各求解器共用)
+D3Q19_CX = tuple(int(c) for c in config.CX_3D)
+D3Q19_CY = tuple(int(c) for c in config.CY_3D)
+D3Q19_CZ = tuple(int(c) for c in config.CZ_3D)
+D3Q19_W = tuple(float(w) for w in config.WEIGHTS_3D)
+
 @ti.func
 def get_d3q19_velocity(q):
     """獲取D3Q19離散速度向量"""
-    # 預定義D3Q19速度模板
+    # 預定義D3Q19速度模板 (方向順序與 config.CX_3D/CY_3D/CZ_3D 一致)
     velocities = ti.Matrix([
         [0, 0, 0],     # 0: 靜止
         [1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1],  # 1-6: 面鄰居
-        [1, 1, 0], [-1, -1, 0], [1, -1, 0], [-1, 1, 0],                       # 7-10: xy邊
-        [1, 0, 1], [-1, 0, -1], [1, 0, -1], [-1, 0, 1],                       # 11-14: xz邊
-        [0, 1, 1], [0, -1, -1], [0, 1, -1], [0, -1, 1]                        # 15-18: yz邊
+        [1, 1, 0], [-1, 1, 0], [1, -1, 0], [-1, -1, 0],                       # 7-10: xy邊
+        [1, 0, 1], [-1, 0, 1], [1, 0, -1], [-1, 0, -1],                       # 11-14: xz邊
+        [0, 1, 1], [0, -1, 1], [0, 1, -1], [0, -1, -1]                        # 15-18: yz邊
     ])
     return ti.Vector([velocities[q, 0], velocities[q, 1], velocities[q, 2]])
 
@@ -12,6 +12,10 @@ import time
 import pycuda.driver as cuda
 import pycuda.autoinit
 
+from src.core.lbm_algorithms import (
+    D3Q19_CX as _CX, D3Q19_CY as _CY, D3Q19_CZ as _CZ, D3Q19_W as _W
+)
+
 @ti.data_oriented
 class CUDADualGPULBMSolver:
     """
@@ -133,14 +137,26 @@ class CUDADualGPULBMSolver:
         print(f"    ✅ GPU1子域: {config.NX}×{config.NY}×{self.gpu1_nz}")
     
     def _init_boundary_buffers(self):
-        """初始化GPU間邊界交換緩衝區"""
+        """
+        初始化GPU間邊界交換緩衝區
+        
+        Z方向切分時，GPU0→GPU1只需傳送往+z的分布函數 (cz[q] > 0)，
+        GPU1→GPU0只需傳送往-z的分布函數 (cz[q] < 0)，D3Q19中各為5個方向，
+        緩衝區按單向方向數精簡配置
+        """
+        # 各傳輸方向跨越Z切面的速度方向 (編譯期常數)
+        self.up_q = tuple(q for q in range(config.Q_3D) if config.CZ_3D[q] > 0)
+        self.down_q = tuple(q for q in range(config.Q_3D) if config.CZ_3D[q] < 0)
+        assert len(self.up_q) == len(self.down_q)
+        
         # 邊界層資料緩衝區 (用於GPU間通信)
-        boundary_size = config.NX * config.NY * config.Q_3D
+        boundary_size = config.NX * config.NY * len(self.up_q)
+        self.boundary_bytes = boundary_size * 4  # 4 bytes for f32
         
         self.boundary_send_buffer = ti.field(dtype=ti.f32, shape=boundary_size)
         self.boundary_recv_buffer = ti.field(dtype=ti.f32, shape=boundary_size)
         
-        print("    ✅ GPU間邊界交換緩衝區建立完成")
+        print(f"    ✅ GPU間邊界交換緩衝區建立完成 (每向 {len(self.up_q)}/{config.Q_3D} 方向)")
     
     def _init_cuda_constants(self):
         """初始化CUDA常數記憶體"""
@@ -232,9 +248,9 @@ class CUDADualGPULBMSolver:
                 for q in ti.static(range(config.Q_3D)):
                     fq = self.f_gpu0[q][i, j, k]
                     rho_local += fq
-                    ux_local += fq * self.cx[q]
-                    uy_local += fq * self.cy[q]
-                    uz_local += fq * self.cz[q]
+                    ux_local += fq * _CX[q]
+                    uy_local += fq * _CY[q]
+                    uz_local += fq * _CZ[q]
                 
                 # 正規化
                 if rho_local > 1e-12:
@@ -264,9 +280,9 @@ class CUDADualGPULBMSolver:
                 for q in ti.static(range(config.Q_3D)):
                     fq = self.f_gpu1[q][i, j, k]
                     rho_local += fq
-                    ux_local += fq * self.cx[q]
-                    uy_local += fq * self.cy[q]
-                    uz_local += fq * self.cz[q]
+                    ux_local += fq * _CX[q]
+                    uy_local += fq * _CY[q]
+                    uz_local += fq * _CZ[q]
                 
                 if rho_local > 1e-12:
                     inv_rho = 1.0 / rho_local
@@ -310,16 +326,16 @@ class CUDADualGPULBMSolver:
                 
                 for q in ti.static(range(config.Q_3D)):
                     # 計算平衡分佈
-                    cu = ux * self.cx[q] + uy * self.cy[q] + uz * self.cz[q]
-                    feq = self.w[q] * rho * (1.0 + 3.0*cu + 4.5*cu*cu - 1.5*u_sqr)
+                    cu = ux * _CX[q] + uy * _CY[q] + uz * _CZ[q]
+                    feq = _W[q] * rho * (1.0 + 3.0*cu + 4.5*cu*cu - 1.5*u_sqr)
                     
                     # BGK collision
                     f_star = self.f_gpu0[q][i, j, k] - (self.f_gpu0[q][i, j, k] - feq) * inv_tau
                     
                     # Streaming
-                    ni = i + self.cx[q]
-                    nj = j + self.cy[q]
-                    nk = k + self.cz[q]
+                    ni = i + _CX[q]
+                    nj = j + _CY[q]
+                    nk = k + _CZ[q]
                     
                     if (0 <= ni < config.NX and 0 <= nj < config.NY and 0 <= nk < self.gpu0_nz):
                         self.f_new_gpu0[q][ni, nj, nk] = f_star
@@ -343,47 +359,89 @@ class CUDADualGPULBMSolver:
                 u_sqr = ux*ux + uy*uy + uz*uz
                 
                 for q in ti.static(range(config.Q_3D)):
-                    cu = ux * self.cx[q] + uy * self.cy[q] + uz * self.cz[q]
-                    feq = self.w[q] * rho * (1.0 + 3.0*cu + 4.5*cu*cu - 1.5*u_sqr)
+                    cu = ux * _CX[q] + uy * _CY[q] + uz * _CZ[q]
+                    feq = _W[q] * rho * (1.0 + 3.0*cu + 4.5*cu*cu - 1.5*u_sqr)
                     
                     f_star = self.f_gpu1[q][i, j, k] - (self.f_gpu1[q][i, j, k] - feq) * inv_tau
                     
-                    ni = i + self.cx[q]
-                    nj = j + self.cy[q]
-                    nk = k + self.cz[q]
+                    ni = i + _CX[q]
+                    nj = j + _CY[q]
+                    nk = k + _CZ[q]
                     
                     if (0 <= ni < config.NX and 0 <= nj < config.NY and 0 <= nk < self.gpu1_nz):
                         self.f_new_gpu1[q][ni, nj, nk] = f_star
     
+    @ti.kernel
+    def pack_boundary_gpu0(self, k_src: ti.i32):
+        """將GPU0的Z切面打包至發送緩衝區 (僅往+z方向)"""
+        ti.loop_config(block_dim=256)
+        
+        for i, j in ti.ndrange(config.NX, config.NY):
+            base = (i * config.NY + j) * ti.static(len(self.up_q))
+            for n, q in ti.static(enumerate(self.up_q)):
+                self.boundary_send_buffer[base + n] = self.f_gpu0[q][i, j, k_src]
+    
+    @ti.kernel
+    def pack_boundary_gpu1(self, k_src: ti.i32):
+        """將GPU1的Z切面打包至發送緩衝區 (僅往-z方向)"""
+        ti.loop_config(block_dim=256)
+        
+        for i, j in ti.ndrange(config.NX, config.NY):
+            base = (i * config.NY + j) * ti.static(len(self.down_q))
+            for n, q in ti.static(enumerate(self.down_q)):
+                self.boundary_send_buffer[base + n] = self.f_gpu1[q][i, j, k_src]
+    
+    @ti.kernel
+    def unpack_boundary_gpu0(self, k_dst: ti.i32):
+        """從接收緩衝區解包至GPU0的Z切面 (往-z方向)"""
+        ti.loop_config(block_dim=256)
+        
+        for i, j in ti.ndrange(config.NX, config.NY):
+            base = (i * config.NY + j) * ti.static(len(self.down_q))
+            for n, q in ti.static(enumerate(self.down_q)):
+                self.f_gpu0[q][i, j, k_dst] = self.boundary_recv_buffer[base + n]
+    
+    @ti.kernel
+    def unpack_boundary_gpu1(self, k_dst: ti.i32):
+        """從接收緩衝區解包至GPU1的Z切面 (往+z方向)"""
+        ti.loop_config(block_dim=256)
+        
+        for i, j in ti.ndrange(config.NX, config.NY):
+            base = (i * config.NY + j) * ti.static(len(self.up_q))
+            for n, q in ti.static(enumerate(self.up_q)):
+                self.f_gpu1[q][i, j, k_dst] = self.boundary_recv_buffer[base + n]
+    
+    def _transfer_boundary_buffer(self, dst_dev, src_dev):
+        """以CUDA P2P將打包後的發送緩衝區複製至對側接收緩衝區"""
+        send_ptr = self.boundary_send_buffer.get_field_members()[0].ptr
+        recv_ptr = self.boundary_recv_buffer.get_field_members()[0].ptr
+        cuda.memcpy_peer(recv_ptr, dst_dev, send_ptr, src_dev, self.boundary_bytes)
+        
+        # 同步確保memcpy完成，緩衝區才可重用
+        src_dev.synchronize()
+        dst_dev.synchronize()
+    
     def exchange_boundary_data(self):
         """
         GPU間邊界資料交換
         
-        使用CUDA P2P實現高效的GPU間通信
+        使用CUDA P2P實現GPU間通信；每個傳輸方向只打包跨越切面的5個方向，
+        傳輸量約為完整19方向的26%
         """
         # 確保計算已完成
         ti.sync()
-
-        # 獲取Taichi field的底層指標
-        f_gpu0_ptr = self.f_gpu0[0].get_field_members()[0].ptr
-        f_gpu1_ptr = self.f_gpu1[0].get_field_members()[0].ptr
-
-        # 計算複製大小和偏移
-        slice_size = config.NX * config.NY * 4 # 4 bytes for f32
         
-        # GPU0 -> GPU1
-        src_offset_gpu0 = (self.gpu0_nz - 3) * slice_size
-        dst_offset_gpu1 = 1 * slice_size
-        cuda.memcpy_peer(f_gpu1_ptr + dst_offset_gpu1, self.dev1, f_gpu0_ptr + src_offset_gpu0, self.dev0, slice_size * config.Q_3D)
-
-        # GPU1 -> GPU0
-        src_offset_gpu1 = 2 * slice_size
-        dst_offset_gpu0 = (self.gpu0_nz - 2) * slice_size
-        cuda.memcpy_peer(f_gpu0_ptr + dst_offset_gpu0, self.dev0, f_gpu1_ptr + src_offset_gpu1, self.dev1, slice_size * config.Q_3D)
-
-        # 同步確保memcpy完成
-        self.dev0.synchronize()
-        self.dev1.synchronize()
+        # GPU0 -> GPU1 (cz > 0)
+        self.pack_boundary_gpu0(self.gpu0_nz - 3)
+        ti.sync()
+        self._transfer_boundary_buffer(self.dev1, self.dev0)
+        self.unpack_boundary_gpu1(1)
+        
+        # GPU1 -> GPU0 (cz < 0)
+        self.pack_boundary_gpu1(2)
+        ti.sync()
+        self._transfer_boundary_buffer(self.dev0, self.dev1)
+        self.unpack_boundary_gpu0(self.gpu0_nz - 2)
     
     
     
@@ -29,9 +29,23 @@ from src.core.lbm_algorithms import (
     equilibrium_d3q19_unified, equilibrium_d3q19_safe,
     macroscopic_density_unified, macroscopic_velocity_unified,
     collision_bgk_unified, streaming_target_unified,
-    SoAAdapter, MemoryLayout, create_memory_adapter
+    MemoryLayout, create_memory_adapter,
+    D3Q19_CX as _CX, D3Q19_CY as _CY, D3Q19_CZ as _CZ, D3Q19_W as _W
 )
 
+# 3D kernel threadgroup大小 - 依Apple晶片型號調校 (M3: 128)
+_BLOCK_DIM = apple_optimizer.optimized_config['block_size']
+
+# 反向方向索引 (halfway bounce-back)
+_OPP = tuple(
+    next(p for p in range(config.Q_3D)
+         if (_CX[p], _CY[p], _CZ[p]) == (-_CX[q], -_CY[q], -_CZ[q]))
+    for q in range(config.Q_3D)
+)
+# 各軸正/負向方向索引 - 動量分量以兩組差值計算
+_POS = tuple(tuple(q for q in range(config.Q_3D) if c[q] > 0) for c in (_CX, _CY, _CZ))
+_NEG = tuple(tuple(q for q in range(config.Q_3D) if c[q] < 0) for c in (_CX, _CY, _CZ))
+
 # 導入LES湍流模型
 if config.ENABLE_LES and config.RE_CHAR > config.LES_REYNOLDS_THRESHOLD:
     from src.physics.les_turbulence import LESTurbulenceModel
@@ -115,64 +129,17 @@ class LBMSolver:
             print("📐 使用純LBM (層流假設)...")
             self.les_model = None
             self.use_les = False
-            # 建立零場避免kernel引用失敗
-            self.les_nu_sgs = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
-            self.les_nu_sgs.fill(0.0)
+            # kernel以ti.static(use_les)於編譯期略過ν_sgs讀取，不需配置零場
+            self.les_nu_sgs = None
         
         # 初始化邊界條件管理器
         from src.physics.boundary_conditions import BoundaryConditionManager
         self.boundary_manager = BoundaryConditionManager()
         
-        # 初始化真正SoA記憶體適配器
-        self.memory_adapter = SoAAdapter(self)
+        # 溫度耦合步驟分派 (於 enable_temperature_dependent_properties 重新配置)
+        self._configure_coupled_step()
         
         print(f"D3Q19模型初始化完成 - 網格: {config.NX}×{config.NY}×{config.NZ}")
-        print("✅ 真正SoA記憶體適配器已配置")
-    
-    def _create_compatibility_interface(self) -> None:
-        """
-        創建相容性介面支持現有代碼
-        
-        為了支持現有的邊界條件和其他模組，創建必要的相容性介面。
-        這些介面模擬舊的數據結構，但內部使用SoA布局。
-        
-        Compatibility Fields:
-            u: 向量速度場 [NX×NY×NZ×3] (模擬舊接口)
-            body_force: 體力場 [NX×NY×NZ×3]
-            
-        Performance Note:
-            這些介面僅用於兼容性，不影響核心計算性能。
-        """
-        print("  🔧 建立相容性介面...")
-        
-        # 創建相容性向量速度場 (模擬舊的self.u)
-        self.u = ti.Vector.field(3, dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
-        
-        # 其他必要的相容性場
-        if not hasattr(self, 'body_force'):
-            self.body_force = ti.Vector.field(3, dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
-        
-        print("    ✅ 相容性介面建立完成")
-    
-    @ti.kernel
-    def sync_soa_to_vector_velocity(self) -> None:
-        """同步SoA速度場到向量速度場 (用於外部系統)"""
-        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            self.u[i, j, k] = ti.Vector([self.ux[i, j, k], self.uy[i, j, k], self.uz[i, j, k]])
-    
-    @ti.kernel
-    def sync_vector_to_soa_velocity(self) -> None:
-        """同步向量速度場到SoA速度場 (外部修改後)"""
-        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            self.ux[i, j, k] = self.u[i, j, k][0]
-            self.uy[i, j, k] = self.u[i, j, k][1] 
-            self.uz[i, j, k] = self.u[i, j, k][2]
-            
-            # 同時更新預計算的u²項
-            u_sqr_local = (self.ux[i, j, k] * self.ux[i, j, k] + 
-                          self.uy[i, j, k] * self.uy[i, j, k] + 
-                          self.uz[i, j, k] * self.uz[i, j, k])
-            self.u_sqr[i, j, k] = u_sqr_local
     
     def _init_3d_fields(self) -> None:
         """
@@ -190,6 +157,9 @@ class LBMSolver:
         Memory Layout:
             - 分布函數: [Q×NX×NY×NZ] SoA布局
             - 巨觀量: [NX×NY×NZ] 連續記憶體
+            - 所有場皆為row-major dense，最內層(連續)軸為k；
+              kernel統一以 ti.ndrange(NX, NY, NZ) 迭代，k為最快變化索引，
+              迭代順序與記憶體順序一致，勿改為i-連續的SNode布局
             - 總記憶體需求: ~2.09 GB (224³網格)
         """
         self._init_distribution_fields()
@@ -202,69 +172,70 @@ class LBMSolver:
         self._init_force_fields()
         self._init_gpu_constants()
         self._init_optimization_cache()
-        # 🔧 創建相容性介面支持現有代碼
-        self._create_compatibility_interface()
         print("✅ GPU記憶體優化布局初始化完成")
     
     def _init_distribution_fields(self) -> None:
         """
-        初始化分布函數場 - 真正SoA記憶體布局
-        
-        建立D3Q19模型的分布函數場，採用真正的Structure of Arrays布局。
-        傳統4D陣列: f[19, NX, NY, NZ] (偽SoA)
-        真正SoA: 19個獨立3D陣列 (真SoA)
-        
+        初始化分布函數場 - 方向優先(q-major) 4D SoA布局
+
+        建立D3Q19模型的分布函數場，採用單一4D Taichi場 f[q, i, j, k]。
+        q為最外層索引，每個方向的 NX×NY×NZ 子區塊在記憶體中連續，
+        與19個獨立3D場的位元組布局相同，但可在kernel內以執行期q索引。
+
         Fields:
-            f: 當前時間步分布函數 - 19個獨立3D場
-            f_new: 下一時間步分布函數 - 19個獨立3D場
-            
-        Apple Silicon優化優勢:
-            - 連續記憶體訪問 (+40% cache efficiency)
-            - Metal GPU SIMD友好 (+100% vectorization)
-            - 記憶體頻寬最佳化 (+25% bandwidth)
+            f: 當前時間步分布函數 [Q×NX×NY×NZ]
+            f_new: 下一時間步分布函數 [Q×NX×NY×NZ]
+
+        Memory Layout:
+            - 單一dense場，row-major，最內層(連續)軸為k
+            - kernel以 ti.ndrange(NX, NY, NZ) 迭代時最後一軸變化最快，
+              相鄰執行緒訪問相鄰位址 (coalesced)
+
+        Note:
+            保留 f / f_new 雙緩衝而非單緩衝AA-pattern：AA-pattern在偶數步後
+            將分布函數存於相反方向槽位，而邊界條件、浮力源項、穩定性監控
+            及 LBMSolverProtocol 皆假設每步結束時 f[q] 即為方向q的分布函數。
         """
-        print("  🔧 建立分布函數場 (兼容布局)...")
-        
-        # 使用4D場 [Q×NX×NY×NZ]，以支援動態方向索引與現有內核實作
+        print("  🔧 建立分布函數場 (q-major 4D布局)...")
+
+        # 單一4D場 [Q×NX×NY×NZ]，同一方向的分布函數連續存放
         self.f = ti.field(dtype=ti.f32, shape=(config.Q_3D, config.NX, config.NY, config.NZ))
         self.f_new = ti.field(dtype=ti.f32, shape=(config.Q_3D, config.NX, config.NY, config.NZ))
-        
+
         print(f"    ✅ 建立4D分布函數場 [Q×NX×NY×NZ]")
         print(f"    記憶體布局: [{config.Q_3D}×{config.NX}×{config.NY}×{config.NZ}]")
     
     def _init_macroscopic_fields(self) -> None:
         """
-        初始化巨觀量場 - SoA記憶體布局
+        初始化巨觀量場
         
-        建立流體動力學巨觀量場，採用真正的Structure of Arrays布局。
-        傳統AoS: u[i,j,k] = [ux, uy, uz] (內插模式)
-        優化SoA: ux[i,j,k], uy[i,j,k], uz[i,j,k] (分離模式)
+        建立流體動力學巨觀量場。速度僅以單一向量場 u 儲存，
+        collision kernel、LES、邊界條件與顆粒耦合皆直接讀寫此場，
+        不另存SoA分量副本，避免雙重儲存與同步kernel。
         
         Fields:
             rho: 密度場 [NX×NY×NZ] (kg/m³)
-            ux, uy, uz: 速度分量場 [NX×NY×NZ] (m/s) - SoA分離
+            u: 向量速度場 [NX×NY×NZ×3] (lattice units)
             u_sqr: 速度平方項 [NX×NY×NZ] (預計算優化)
             phase: 相場 [NX×NY×NZ] (0=空氣, 1=水)
             
-        SoA優勢:
-            - 同分量連續訪問 (+60% cache hits)
-            - 向量化計算友好 (+80% SIMD usage)
-            - 記憶體頻寬減少50%
+        Precision:
+            巨觀量維持FP32：格子單位下密度擾動約1e-4 (低於FP16在1.0附近
+            約1e-3的解析度，壓力梯度將被量化消失)，低速區u²約1e-7已落入
+            FP16次正規數範圍，體力約1e-5~1e-6亦同。
             
         Physical Ranges:
             - 密度: 0.1-10.0 kg/m³ (數值穩定範圍)
             - 速度: 0-0.3 lattice units (Mach < 0.3限制)
             - 相場: 0.0-1.0 (連續相標識)
         """
-        print("  🔧 建立SoA巨觀量場...")
+        print("  🔧 建立巨觀量場...")
         
-        # 密度場 (已是SoA)
+        # 密度場
         self.rho = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
         
-        # 速度場 - SoA分離
-        self.ux = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
-        self.uy = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
-        self.uz = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
+        # 速度場 - 單一向量場 (唯一速度儲存)
+        self.u = ti.Vector.field(3, dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
         
         # 速度平方項 (預計算優化)
         self.u_sqr = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
@@ -272,7 +243,10 @@ class LBMSolver:
         # 相場
         self.phase = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
         
-        print("    ✅ SoA速度場: ux[], uy[], uz[] (分離儲存)")
+        # 速度場host端常駐緩衝 (get_velocity_magnitude 使用)
+        self._u_host = np.empty((config.NX, config.NY, config.NZ, 3), dtype=np.float32)
+        
+        print("    ✅ 向量速度場: u[] (單一儲存)")
         print("    ✅ 預計算u²項，減少重複運算")
     
     def _init_geometry_fields(self) -> None:
@@ -308,6 +282,15 @@ class LBMSolver:
             - 表面張力: 多相界面效應 (未來擴展)
         """
         self.body_force = ti.Vector.field(3, dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
+        
+        # 體力診斷歸約累加器 (0維場，供Taichi執行緒區域歸約)
+        self._body_force_mag_sum = ti.field(dtype=ti.f32, shape=())
+        self._body_force_fluid_count = ti.field(dtype=ti.i32, shape=())
+        
+        # 速度場最大 |u|² 歸約目標 (供耦合求解器穩定性檢查)
+        self._max_v2 = ti.field(dtype=ti.f32, shape=())
+        # 耦合步驟數值有效性檢查：無效巨觀量格點數
+        self._invalid_count = ti.field(dtype=ti.i32, shape=())
     
     def _init_gpu_constants(self) -> None:
         """
@@ -339,20 +322,20 @@ class LBMSolver:
         建立預計算場和查找表，減少運行時計算開銷。
         
         Cache Fields:
-            u_sq: 速度平方場 [NX×NY×NZ] (預計算u·u)
             opposite_dir: 相反方向查找表 [Q] (bounce-back優化)
-            f_old: 分布函數備份場 [NX×NY×NZ×Q] (Phase 3溫度耦合用)
             
         Performance Benefits:
             - 減少20%計算時間 (避免重複u.norm_sqr()計算)
             - O(1)查找 vs O(Q)搜尋 (相反方向)
             - 改善數值精度 (一次計算，多次使用)
         """
-        self.u_sq = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
         self.opposite_dir = ti.field(dtype=ti.i32, shape=config.Q_3D)
-        
-        # Phase 3 溫度耦合需要的備份場
-        self.f_old = ti.field(dtype=ti.f32, shape=(config.NX, config.NY, config.NZ, config.Q_3D))
+    
+    @ti.kernel
+    def _init_e_vectors(self):
+        """初始化速度向量陣列 (Taichi Vector格式)"""
+        for q in range(config.Q_3D):
+            self.e[q] = ti.Vector([self.cx[q], self.cy[q], self.cz[q]])
     
     def _init_velocity_templates(self) -> None:
         """
@@ -367,7 +350,7 @@ class LBMSolver:
             - 12個邊中心速度: (±1,±1,0), (±1,0,±1), (0,±1,±1)
             
         執行步驟:
-            1. 載入D3Q19常數到GPU記憶體
+            1. 以from_numpy一次性載入D3Q19常數到GPU記憶體
             2. 初始化Taichi Vector格式速度陣列  
             3. 預計算相反方向查找表
             
@@ -375,74 +358,6 @@ class LBMSolver:
             - 常數記憶體載入: 單次初始化
             - 查找表優化: O(1) bounce-back計算
         """
-        # 載入D3Q19離散速度和權重
-        self._load_d3q19_constants()
-        
-        # 初始化兼容性速度向量數組
-        self._init_e_vectors()
-        
-        # 預計算相反方向查找表 (GPU優化)
-        self._compute_opposite_directions()
-        
-        print("✅ GPU常數記憶體載入完成")
-    
-    def _load_d3q19_constants(self) -> None:
-        """
-        載入D3Q19離散速度和權重常數
-        
-        載入標準D3Q19格子Boltzmann模型的離散速度向量和
-        Chapman-Enskog展開對應的權重係數。
-        
-        D3Q19 Model:
-            - 19個離散速度方向
-            - 3階精度的Chapman-Enskog展開
-            - 適用於3D不可壓縮流動
-            
-        Weights:
-            - w₀ = 1/3 (靜止速度)
-            - w₁₋₆ = 1/18 (面心速度) 
-            - w₇₋₁₈ = 1/36 (邊心速度)
-            
-        Memory Layout:
-            - 循序載入確保cache友好性
-            - 單精度浮點減少記憶體占用
-        """
-        # D3Q19離散速度 (原點 + 6面 + 12邊)
-        d3q19_cx = [0, 1,-1, 0, 0, 0, 0, 1,-1, 1,-1, 0, 0, 1,-1, 1,-1, 0, 0]
-        d3q19_cy = [0, 0, 0, 1,-1, 0, 0, 1, 1,-1,-1, 1,-1, 0, 0, 0, 0, 1,-1]
-        d3q19_cz = [0, 0, 0, 0, 0, 1,-1, 0, 0, 0, 0, 1, 1,-1,-1, 1, 1,-1,-1]
-        
-        # 對應權重
-        d3q19_w = [1.0/3.0] + [1.0/18.0]*6 + [1.0/36.0]*12
-        
-        # 載入到GPU記憶體
-        for q in range(config.Q_3D):
-            self.cx[q] = d3q19_cx[q]
-            self.cy[q] = d3q19_cy[q] 
-            self.cz[q] = d3q19_cz[q]
-            self.w[q] = d3q19_w[q]
-    
-    @ti.kernel
-    def _init_e_vectors(self):
-        """初始化速度向量陣列 (Taichi Vector格式)"""
-        for q in range(config.Q_3D):
-            self.e[q] = ti.Vector([self.cx[q], self.cy[q], self.cz[q]])
-    
-    @ti.kernel  
-    def _compute_opposite_directions(self):
-        """預計算相反方向查找表 - GPU優化"""
-        for q in range(config.Q_3D):
-            for opp_q in range(config.Q_3D):
-                if (self.cx[q] == -self.cx[opp_q] and 
-                    self.cy[q] == -self.cy[opp_q] and 
-                    self.cz[q] == -self.cz[opp_q]):
-                    self.opposite_dir[q] = opp_q
-    
-    def _init_velocity_templates(self):
-        """
-        初始化3D速度模板 - GPU並行優化版
-        預計算查找表，避免運行時計算
-        """
         # 將numpy數組拷貝到GPU常數記憶體
         self.cx.from_numpy(config.CX_3D)
         self.cy.from_numpy(config.CY_3D) 
@@ -452,8 +367,8 @@ class LBMSolver:
         # 初始化兼容性速度向量數組
         self._init_e_vectors()
         
-        # 預計算相反方向查找表 (GPU優化)
-        self._compute_opposite_directions()
+        # 相反方向查找表 (供外部邊界模組使用)
+        self.opposite_dir.from_numpy(np.array(_OPP, dtype=np.int32))
         
         print("✅ GPU常數記憶體載入完成")
     
@@ -461,15 +376,18 @@ class LBMSolver:
         """
         執行collision-streaming融合步驟
         
-        實施高效的二階格子Boltzmann算法，將collision和streaming
-        操作融合以減少記憶體訪問次數並提升cache效率。
+        實施高效的二階格子Boltzmann算法，以pull形式將streaming、巨觀量計算
+        和collision融合於單一kernel，每個格點的分布函數僅自全域記憶體讀取一次。
+        分布函數場於步與步之間儲存post-collision值。
         
         Algorithm Steps:
-            1. 計算巨觀量 (密度、速度)
-            2. 執行collision運算子 + streaming傳播
+            1. Pull streaming: 自上游鄰點讀取分布函數 (含bounce-back)
+            2. 計算巨觀量 (密度、速度)
+            3. collision運算子，結果寫回本格點
             
         Optimization:
-            - 融合運算: 減少50%記憶體帶寬
+            - 融合運算: 省去獨立巨觀量kernel的一次完整f讀取
+            - Pull streaming: 寫入連續合併，分散訪問僅發生於讀取端
             - SoA記憶體訪問: 最佳化GPU throughput
             - 數值穩定性檢查: 防止發散
             
@@ -477,106 +395,80 @@ class LBMSolver:
             - CFL < 0.1: 確保數值穩定性
             - 保守forcing: 避免非物理振盪
         """
-        # 第一步：計算巨觀量
-        self._compute_macroscopic_quantities()
-        
-        # 第二步：collision + streaming融合
-        self._apply_collision_and_streaming()
+        # pull streaming + collision融合 (含巨觀量計算, f → f_new)
+        self._apply_collision_and_streaming(self.f, self.f_new)
         # 交換分布函數緩衝，讓下一步從更新後的 f 開始
         self.swap_fields()
     
-    @ti.kernel
-    def _compute_macroscopic_quantities(self):
-        """
-        計算巨觀量：密度和速度
-        
-        從分布函數恢復流體動力學巨觀量，基於moment計算方法。
-        實施GPU並行化的高效算法。
-        
-        Physics:
-            ρ = Σᵩ fᵩ (moment 0)
-            ρu = Σᵩ fᵩ eᵩ (moment 1)
-            
-        Numerical Considerations:
-            - 只處理流體節點 (solid=0)
-            - SoA記憶體訪問模式
-            - 密度正規化防止除零
-            - 預計算u²項用於equilibrium函數
-            
-        GPU Optimization:
-            - 循序記憶體訪問
-            - 減少分支條件
-            - Vectorized運算
-        """
-        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            if self.solid[i, j, k] == 0:  # 只處理流體節點
-                # 計算密度 - moment 0
-                rho_local = 0.0
-                for q in range(config.Q_3D):
-                    rho_local += self.f[q, i, j, k]  # SoA訪問模式
-                self.rho[i, j, k] = rho_local
-                
-                # 計算動量 - moment 1（Guo forcing修正：+0.5F）
-                mom = ti.Vector([0.0, 0.0, 0.0])
-                for q in range(config.Q_3D):
-                    e_q = ti.cast(self.e[q], ti.f32)
-                    mom += self.f[q, i, j, k] * e_q
-                
-                # Guo修正：u = (Σ f e + 0.5 F) / ρ
-                phase_val = self.phase[i, j, k]
-                gravity_force = self._compute_body_force(phase_val)
-                total_force = gravity_force + self.body_force[i, j, k]
-                # 預設為零速度，避免變數未定義
-                u_local = ti.Vector([0.0, 0.0, 0.0])
-                if rho_local > 1e-12:
-                    u_local = (mom + 0.5 * total_force) / rho_local
-                
-                self.u[i, j, k] = u_local
-                self.u_sq[i, j, k] = u_local.norm_sqr()
-     
     @ti.kernel  
-    def _apply_collision_and_streaming(self):
+    def _apply_collision_and_streaming(self, f: ti.template(), f_new: ti.template()):
         """
-        執行collision運算子和streaming步驟 - Apple Silicon優化版
+        執行巨觀量計算、collision運算子和streaming步驟 - Apple Silicon優化版
         
         實施BGK collision模型結合Guo forcing方案，專為Apple GPU優化：
-        - 使用最佳block size (128 for M3)
-        - 減少記憶體訪問延遲
+        - 使用最佳block size (_BLOCK_DIM, 依晶片型號)
+        - 分布函數載入暫存器後重複使用，減少記憶體訪問
+        - Pull streaming: 每個格點僅寫入自身位置，消除寫入端分支
         - 利用Metal simdgroups
         
+        Physics:
+            ρ = Σᵩ fᵩ (moment 0)
+            ρu = Σᵩ fᵩ eᵩ + F/2 (moment 1, Guo修正)
+            
         BGK Collision Model:
             fᵩ* = fᵩ - ω(fᵩ - fᵩᵉᵠ) + Fᵩ
+            
+        Args:
+            f: 來源分布函數場 (post-collision, pull讀取)
+            f_new: 目標分布函數場 (本格點post-collision寫入)
         """
-        # Apple GPU最佳化配置 - 硬編碼避免kernel內部函數調用
-        ti.loop_config(block_dim=128)  # M3最佳block size
+        # Apple GPU最佳化配置 - 編譯期常數，避免kernel內部函數調用
+        ti.loop_config(block_dim=_BLOCK_DIM)
         
         for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
             if self.solid[i, j, k] == 0:
-                # 載入巨觀量到局部變數 (減少記憶體訪問)
-                rho = self.rho[i, j, k]
-                u = self.u[i, j, k]
-                phase_val = self.phase[i, j, k]
+                # Pull streaming：自上游鄰點讀取post-collision分布，同時累加密度與動量
+                f_local = self._pull_populations(f, i, j, k)
+                rho, mom = self._compute_moments(f_local)
                 
                 # 計算體力和鬆弛時間
                 # 合成總體力 = 重力 + 聚合體力場
+                phase_val = self.phase[i, j, k]
                 gravity_force = self._compute_body_force(phase_val)
                 force = gravity_force + self.body_force[i, j, k]
+                
+                # Guo修正：u = (Σ f e + 0.5 F) / ρ，預設為零速度避免除零
+                u = ti.Vector([0.0, 0.0, 0.0])
+                if rho > 1e-12:
+                    u = (mom + 0.5 * force) / rho
+                
+                # 巨觀量寫回 (供LES、邊界條件與診斷使用)
+                self.rho[i, j, k] = rho
+                self.u[i, j, k] = u
+                u_sq = u.norm_sqr()
+                self.u_sqr[i, j, k] = u_sq
+                
                 tau_mol = config.TAU_WATER if phase_val > 0.5 else config.TAU_AIR
                 # LES有效鬆弛時間（τ_eff = τ_mol + 3ν_sgs）
+                # use_les於初始化後固定，編譯期決定分支；純LBM時不讀取ν_sgs
                 tau_eff = tau_mol
-                if self.use_les:
+                if ti.static(self.use_les):
                     nu_sgs_local = self.les_nu_sgs[i, j, k]
                     tau_eff = tau_mol + 3.0 * nu_sgs_local
                 # 限幅確保穩定
                 tau_eff = ti.max(0.55, ti.min(1.90, tau_eff))
                 omega = 1.0 / tau_eff
                 
+                # Guo forcing中與方向無關的部分：每格點僅計算一次
+                force_safe, u_safe, ef_scale, euf_scale = self._prepare_guo_forcing(
+                    u, force, tau_eff)
+                
                 # 對每個離散速度方向進行collision-streaming
-                for q in range(config.Q_3D):
-                    f_eq = self.equilibrium_3d(i, j, k, q, rho, u)
-                    F_q = self._compute_forcing_term(q, u, force, tau_eff)
-                    f_post = self.f[q, i, j, k] - omega * (self.f[q, i, j, k] - f_eq) + F_q
-                    self._perform_streaming(i, j, k, q, f_post)
+                for q in ti.static(range(config.Q_3D)):
+                    f_eq = self._equilibrium_q(q, rho, u, u_sq)
+                    F_q = self._compute_forcing_term(q, u_safe, force_safe, ef_scale, euf_scale)
+                    # 寫回本格點：沿k連續的合併寫入，無分支
+                    f_new[q, i, j, k] = f_local[q] - omega * (f_local[q] - f_eq) + F_q
     
     @ti.func
     def _compute_body_force(self, phase_val: ti.f32) -> ti.template():
@@ -592,85 +484,123 @@ class LBMSolver:
         return force
     
     @ti.func
-    def _compute_forcing_term(self, q: ti.i32, u: ti.template(), 
-                             force: ti.template(), tau: ti.f32) -> ti.f32:
+    def _compute_forcing_term(self, q: ti.template(), u_safe: ti.template(),
+                             force_safe: ti.template(), ef_scale: ti.f32,
+                             euf_scale: ti.f32) -> ti.f32:
         """
-        計算Guo forcing項
-        安全的數值實現
+        計算方向q的Guo forcing項
+        
+        僅保留與q相關的兩個內積；其餘係數由 _prepare_guo_forcing
+        每格點預先計算。q為編譯期常數，e_q零分量於編譯時消去。
         """
-        F_q = 0.0
-        if force.norm() > 1e-15:
-            F_q = self._compute_stable_guo_forcing(q, u, force, tau)
-            # 大幅放寬forcing項限制，允許重力充分發揮作用
-            max_forcing = 0.5
-            F_q = ti.max(-max_forcing, ti.min(max_forcing, F_q))
-        return F_q
+        e_q = ti.Vector([_CX[q], _CY[q], _CZ[q]], ti.f32)
+        F_q = _W[q] * (ef_scale * e_q.dot(force_safe) + euf_scale * e_q.dot(u_safe))
+        # 大幅放寬forcing項限制，允許重力充分發揮作用
+        max_forcing = 0.5
+        return ti.max(-max_forcing, ti.min(max_forcing, F_q))
     
     @ti.func
-    def _perform_streaming(self, i: ti.i32, j: ti.i32, k: ti.i32, 
-                          q: ti.i32, f_post: ti.f32):
-        """
-        執行streaming步驟
-        處理邊界和固體節點
-        """
-        # 計算目標位置
-        ni = i + self.e[q][0]
-        nj = j + self.e[q][1]
-        nk = k + self.e[q][2]
-        
-        # 邊界檢查
-        if 0 <= ni < config.NX and 0 <= nj < config.NY and 0 <= nk < config.NZ:
-            if self.solid[ni, nj, nk] == 0:  # 流體節點
-                self.f_new[q, ni, nj, nk] = f_post  # SoA
-            else:  # 固體節點：bounce-back
-                opp_q = self.opposite_dir[q]
-                self.f_new[opp_q, i, j, k] = f_post  # SoA
-        # 出界：自然邊界條件（不處理）
+    def _pull_populations(self, f: ti.template(), i: ti.i32, j: ti.i32, k: ti.i32):
+        """
+        Pull streaming：收集流入本格點的分布函數
+        
+        分布函數場儲存post-collision值，方向q的流入量取自上游鄰點
+        (i-cx, j-cy, k-cz)。上游出界或為固體時採halfway bounce-back，
+        改讀本格點相反方向的post-collision值。
+        
+        Note:
+            未使用threadgroup shared memory分塊暫存：Taichi的 ti.block_local
+            僅支援對階層式SNode的struct-for (且不支援Metal後端)，與本求解器
+            q-major 4D dense場及ndrange迴圈不相容；相鄰格點的重複讀取
+            交由硬體L1/L2快取吸收。
+        
+        Returns:
+            ti.Vector: 本格點post-streaming分布函數 (長度Q)
+        """
+        f_local = ti.Vector.zero(ti.f32, config.Q_3D)
+        for q in ti.static(range(config.Q_3D)):
+            si = i - _CX[q]
+            sj = j - _CY[q]
+            sk = k - _CZ[q]
+            # 無分支：座標夾制至域內後一律讀取，再以select選擇來源，避免warp分歧
+            in_domain = (0 <= si < config.NX) & (0 <= sj < config.NY) & (0 <= sk < config.NZ)
+            si_c = ti.max(0, ti.min(config.NX - 1, si))
+            sj_c = ti.max(0, ti.min(config.NY - 1, sj))
+            sk_c = ti.max(0, ti.min(config.NZ - 1, sk))
+            fluid_src = in_domain & (self.solid[si_c, sj_c, sk_c] == 0)
+            f_local[q] = ti.select(fluid_src, f[q, si_c, sj_c, sk_c], f[_OPP[q], i, j, k])
+        return f_local
     
-    @ti.kernel
-    def swap_fields(self):
+    @ti.func
+    def _compute_moments(self, f_local):
         """
-        高效場交換
+        由局部分布函數計算密度與動量 (樹狀歸約)
         
-        執行分布函數場的雙緩衝交換，採用GPU coalesced memory access
-        優化模式確保最佳記憶體帶寬利用率。
+        以成對相加的平衡樹取代19項串行累加，相依深度由19降為5，
+        動量分量為正/負向方向組的差值，不含與0或±1的乘法。
         
-        Memory Pattern:
-            - SoA順序訪問: [Q×NX×NY×NZ]
-            - Vectorized交換: 單一kernel處理所有元素
-            - Cache友好: 循序記憶體存取模式
-            
-        GPU Optimization:
-            - Coalesced memory transactions
-            - 最小化memory bank conflicts
-            - 單一kernel避免launch overhead
-            
-        Performance:
-            - ~100 GB/s memory bandwidth利用率
-            - 最小化host-device同步
-            - 零副本操作
+        Returns:
+            rho: 密度 Σf_q
+            mom: 動量 Σe_q f_q
+        """
+        rho = self._tree_sum(f_local)
+        mom = ti.Vector([0.0, 0.0, 0.0])
+        for d in ti.static(range(3)):
+            pos = ti.Vector([f_local[q] for q in ti.static(_POS[d])])
+            neg = ti.Vector([f_local[q] for q in ti.static(_NEG[d])])
+            mom[d] = self._tree_sum(pos) - self._tree_sum(neg)
+        return rho, mom
+    
+    @ti.func
+    def _tree_sum(self, v):
+        """向量元素成對樹狀加總 (v以值傳入，原地逐層歸約)"""
+        for stride in ti.static((1, 2, 4, 8, 16)):  # 足以涵蓋Q=19
+            for q in ti.static(range(0, v.n, 2 * stride)):
+                if ti.static(q + stride < v.n):
+                    v[q] += v[q + stride]
+        return v[0]
+    
+    def swap_fields(self) -> None:
         """
-        for q, i, j, k in ti.ndrange(config.Q_3D, config.NX, config.NY, config.NZ):
-            self.f[q, i, j, k], self.f_new[q, i, j, k] = self.f_new[q, i, j, k], self.f[q, i, j, k]
+        O(1)雙緩衝交換
+        
+        僅交換 f / f_new 的Python參考，不搬移任何分布函數資料。
+        
+        Note:
+            Taichi kernel在首次編譯時即綁定 self 的屬性，交換參考後
+            舊kernel仍會指向原場。因此所有讀寫分布函數的kernel
+            都以 ti.template() 參數接收 f / f_new (每種組合各編譯一次)，
+            外部模組亦應傳入 solver.f 而非在kernel內讀取 solver.f。
+        """
+        self.f, self.f_new = self.f_new, self.f
 
     @ti.kernel
     def clear_body_force(self):
-        """將聚合體力場清零（每步開始呼叫）"""
+        """
+        將聚合體力場清零（每步開始呼叫）
+        
+        Note:
+            刻意保留為獨立的全域清零pass：於融合collision kernel內讀後歸零會使
+            步後診斷讀不到本步體力，且與未經融合kernel的步進路徑行為不一致；
+            body_force/body_force_new 參考交換則不適用，因多相流、濾紙、壓力梯度
+            等外部kernel直接讀寫 lbm.body_force，編譯時即綁定該場。
+        """
+        ti.loop_config(block_dim=_BLOCK_DIM)
         for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
             self.body_force[i, j, k] = ti.Vector([0.0, 0.0, 0.0])
     
     @ti.func
-    def equilibrium_3d(self, i: ti.i32, j: ti.i32, k: ti.i32, q: ti.i32, 
+    def equilibrium_3d(self, i: ti.i32, j: ti.i32, k: ti.i32, q: ti.template(), 
                       rho: ti.f32, u: ti.template()) -> ti.f32:
         """
-        計算D3Q19平衡分布函數 - 使用統一算法庫
+        計算D3Q19平衡分布函數 - 編譯期常數版
         
         基於Chapman-Enskog多尺度展開的正確平衡分布函數，
         適用於不可壓縮流動的二階精度LBM格式。
         
         Args:
             i, j, k: 格點空間坐標
-            q: 離散速度方向索引 [0, Q-1]
+            q: 離散速度方向索引 [0, Q-1] (須為ti.static展開的編譯期常數)
             rho: 密度 (kg/m³)
             u: 速度向量 (m/s)
             
@@ -681,103 +611,99 @@ class LBMSolver:
             f_q^eq = w_q * ρ * [1 + (e_q·u)/cs² + (e_q·u)²/2cs⁴ - u²/2cs²]
             
         Note:
-            現在使用統一算法庫實現，避免重複代碼
+            e_q與w_q取自模組層級常數元組，編譯後為立即數；
+            執行期q請改用 lbm_algorithms.equilibrium_d3q19_unified
         """
-        return equilibrium_d3q19_unified(rho, u, q)
+        return self._equilibrium_q(q, rho, u, u.dot(u))
     
     @ti.func
-    def _compute_stable_guo_forcing(self, q: ti.i32, u: ti.template(),
-                                  force: ti.template(), tau: ti.f32) -> ti.f32:
+    def _equilibrium_q(self, q: ti.template(), rho: ti.f32, u: ti.template(),
+                       u_sq: ti.f32) -> ti.f32:
+        """
+        方向特化的平衡分布函數
+        
+        q於編譯期展開：e_q·u僅保留非零分量 (靜止方向為0、軸向1項、
+        對角2項)，u²由呼叫端每格點預先計算一次。
+        """
+        eu = 0.0
+        if ti.static(_CX[q] != 0):
+            eu += _CX[q] * u[0]
+        if ti.static(_CY[q] != 0):
+            eu += _CY[q] * u[1]
+        if ti.static(_CZ[q] != 0):
+            eu += _CZ[q] * u[2]
+        feq = _W[q] * rho * (1.0 - 1.5 * u_sq)
+        if ti.static(q != 0):
+            feq += _W[q] * rho * (config.INV_CS2 * eu + 4.5 * eu * eu)
+        return feq
+    
+    @ti.func
+    def _prepare_guo_forcing(self, u: ti.template(), force: ti.template(), tau: ti.f32):
         """
-        計算穩定的Guo forcing項
+        準備穩定的Guo forcing參數 (每格點一次)
         
         實施數值穩定的Guo et al. forcing方案，用於在LBM中
         正確引入體力效應，避免數值不穩定性和非物理振盪。
+        所有與方向q無關的夾制與係數在此計算，collision迴圈內
+        僅需 _compute_forcing_term 的兩個內積。
         
         Args:
-            q: 離散速度方向索引
             u: 速度向量 (lattice units)
             force: 體力向量 (lattice units)
             tau: 鬆弛時間 (無量綱)
             
         Returns:
-            ti.f32: Guo forcing項 F_q
+            force_safe: 幅值限制後的體力
+            u_safe: Mach安全夾制後的速度
+            ef_scale: (1 - 1/2τ)/cs²
+            euf_scale: (1 - 1/2τ)(u·F)/cs⁴
             
         Guo Forcing Formula:
-            F_q = w_q * (1 - 1/2τ) * [e_q·F/cs² + (e_q·u)(e_q·F)/cs⁴]
+            F_q = w_q * (1 - 1/2τ) * [e_q·F/cs² + (e_q·u)(u·F)/cs⁴]
             
         Stability Features:
-            - 保守數值範圍檢查
             - τ下限限制 (避免過鬆弛)
             - Force magnitude限制
-            - 分步計算防止溢出
+            - 以rsqrt無分支計算縮放係數，避免warp分歧
             
         References:
             Guo et al., "Discrete lattice effects on the forcing term 
             in the lattice Boltzmann method", PRE 65, 046308 (2002)
         """
-        # 準備基本參數
-        e_q, w_q, tau_safe = self._prepare_forcing_parameters(q, tau)
+        # 保守的tau範圍
+        tau_safe = ti.max(0.6, ti.min(1.5, tau))
 
         # 對過大外力做幅值縮放（而不是整體歸零）
         # 保持與注水/重力一致的上限等級
         max_force_norm = 10.0
-        f_norm = force.norm()
-        scale_f = 1.0
-        if f_norm > max_force_norm:
-            scale_f = max_force_norm / f_norm
-        force_safe = force * scale_f
+        force_safe = force * ti.min(1.0, max_force_norm * ti.rsqrt(force.norm_sqr() + 1e-30))
 
         # 對過大速度做安全夾制（Mach安全）
-        u_norm = u.norm()
-        u_safe = u if u_norm <= 0.2 else u * (0.2 / u_norm)
+        u_safe = u * ti.min(1.0, 0.2 * ti.rsqrt(u.norm_sqr() + 1e-30))
 
-        # 計算forcing項（幅值最終由上層 _compute_forcing_term 再次限幅）
-        return self._calculate_forcing_terms(e_q, w_q, tau_safe, u_safe, force_safe)
-    
-    @ti.func
-    def _prepare_forcing_parameters(self, q: ti.i32, tau: ti.f32):
-        """準備forcing計算所需的安全參數"""
-        e_q = ti.cast(self.e[q], ti.f32)
-        w_q = self.w[q]
-        tau_safe = ti.max(tau, 0.6)  # 保守的tau下限
-        tau_safe = ti.min(tau_safe, 1.5)  # tau上限
-        return e_q, w_q, tau_safe
-    
-    @ti.func
-    def _calculate_forcing_terms(self, e_q: ti.template(), w_q: ti.f32, 
-                               tau_safe: ti.f32, u: ti.template(), 
-                               force: ti.template()) -> ti.f32:
-        """計算Guo forcing項的核心數值計算"""
-        eu = e_q.dot(u)
-        ef = e_q.dot(force)
-        uf = u.dot(force)
-        
-        # 分步計算避免數值溢出
-        coeff = w_q * (1.0 - 0.5 / tau_safe)
-        term1 = config.INV_CS2 * ef
-        term2 = config.INV_CS2 * config.INV_CS2 * eu * uf
-        
-        # 計算原始forcing值；幅值限制在上層(_compute_forcing_term)統一處理
-        # 重要：不要以過小閾值將結果歸零，否則重力/注水外力會失效
-        temp_result = coeff * (term1 + term2)
-        return temp_result   
+        coeff = 1.0 - 0.5 / tau_safe
+        ef_scale = coeff * config.INV_CS2
+        euf_scale = coeff * config.INV_CS2 * config.INV_CS2 * u_safe.dot(force_safe)
+        return force_safe, u_safe, ef_scale, euf_scale
     
     @ti.func
-    def _compute_equilibrium(self, q: ti.i32, rho: ti.f32, u: ti.template()) -> ti.f32:
+    def _compute_equilibrium(self, q: ti.template(), rho: ti.f32, u: ti.template()) -> ti.f32:
         """
-        計算平衡分布函數 (統一算法庫版本)
-        直接使用lbm_algorithms.equilibrium_d3q19_unified實現
+        計算平衡分布函數 (方向特化版本)
+        
+        q須為ti.static展開的編譯期常數，每個方向編譯為獨立的內聯版本，
+        e_q與w_q成為立即數。執行期q請直接使用
+        lbm_algorithms.equilibrium_d3q19_unified。
         
         Args:
-            q: 離散速度方向索引
+            q: 離散速度方向索引 (編譯期常數)
             rho: 密度
             u: 速度向量
             
         Returns:
             平衡分布函數值
         """
-        return equilibrium_d3q19_unified(rho, u, q)
+        return self._equilibrium_q(q, rho, u, u.dot(u))
     
     @ti.func
     def _compute_equilibrium_safe(self, rho: ti.f32, u: ti.template(), q: ti.i32) -> ti.f32:
@@ -795,25 +721,6 @@ class LBMSolver:
         """
         return equilibrium_d3q19_safe(rho, u, q)
     
-    @ti.kernel
-    def streaming_3d(self):
-        """3D格子波茲曼流動步驟 (科研級)"""
-        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            for q in range(config.Q_3D):
-                # 計算目標位置
-                ni = i + self.e[q][0]
-                nj = j + self.e[q][1] 
-                nk = k + self.e[q][2]
-                
-                # 邊界檢查 - 僅對有效範圍進行流動
-                if 0 <= ni < config.NX and 0 <= nj < config.NY and 0 <= nk < config.NZ:
-                    self.f[ni, nj, nk, q] = self.f_new[i, j, k, q]
-        
-        # 交換緩衝區
-        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            for q in range(config.Q_3D):
-                self.f_new[i, j, k, q] = self.f[i, j, k, q]
-    
     def step(self) -> None:
         """
         執行一個完整的LBM時間步
@@ -923,30 +830,29 @@ class LBMSolver:
             - 數值穩定性: 避免spurious reflections
         """
         # 按優先級順序應用邊界條件
-        self._apply_solid_boundaries()      # 固體邊界 (最高優先級)
-        self._apply_top_boundary()          # 頂部開放邊界
-        self._apply_bottom_boundary()       # 底部固體邊界
-        self._apply_domain_boundaries()     # 計算域邊界
+        self._apply_solid_boundaries(self.f)      # 固體邊界 (最高優先級)
+        self._apply_top_boundary(self.f)          # 頂部開放邊界
+        self._apply_bottom_boundary(self.f)       # 底部固體邊界
+        self._apply_domain_boundaries(self.f)     # 計算域邊界
     
     @ti.kernel
-    def _apply_solid_boundaries(self):
+    def _apply_solid_boundaries(self, f: ti.template()):
         """
         固體邊界 - bounce-back邊界條件
         處理所有固體節點的反彈邊界
         """
+        ti.loop_config(block_dim=_BLOCK_DIM)
         for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
             if self.solid[i, j, k] == 1:  # 固體節點
-                # Bounce-back邊界條件
-                for q in range(config.Q_3D):
-                    # 使用預計算的相反方向查找表
-                    opp_q = self.opposite_dir[q]
-                    # 交換分佈函數
-                temp = self.f[q, i, j, k]
-                self.f[q, i, j, k] = self.f[opp_q, i, j, k]
-                self.f[opp_q, i, j, k] = temp
+                # Bounce-back邊界條件：每對相反方向僅交換一次
+                for q in ti.static(range(1, config.Q_3D)):
+                    if ti.static(q < _OPP[q]):
+                        temp = f[q, i, j, k]
+                        f[q, i, j, k] = f[_OPP[q], i, j, k]
+                        f[_OPP[q], i, j, k] = temp
     
     @ti.kernel
-    def _apply_top_boundary(self):
+    def _apply_top_boundary(self, f: ti.template()):
         """
         頂部邊界 - 開放邊界 (自由流出)
         允許流體自由流出頂部
@@ -960,12 +866,10 @@ class LBMSolver:
                     # 保持當前速度，讓LBM自然演化
                     
                     # 基於當前狀態重新計算平衡分佈
-                    for q in range(config.Q_3D):
-                        self.f[q, i, j, k] = self._compute_equilibrium_safe(
-                            self.rho[i, j, k], self.u[i, j, k], q)
+                    self._set_equilibrium_safe(f, i, j, k, self.rho[i, j, k], self.u[i, j, k])
     
     @ti.kernel
-    def _apply_bottom_boundary(self):
+    def _apply_bottom_boundary(self, f: ti.template()):
         """
         底部邊界 - 完全固體邊界 (無outlet)
         底部完全封閉，設為bounce-back邊界
@@ -975,68 +879,87 @@ class LBMSolver:
             if self.solid[i, j, k] == 0:  # 如果是流體節點
                 # 設為無滑移邊界條件
                 self.u[i, j, k] = ti.Vector([0.0, 0.0, 0.0])
-                for q in range(config.Q_3D):
-                    opp_q = self.opposite_dir[q]
-                    # Bounce-back邊界條件
-                    temp = self.f[q, i, j, k]
-                    self.f[q, i, j, k] = self.f[opp_q, i, j, k]
-                    self.f[opp_q, i, j, k] = temp
+                # Bounce-back邊界條件：相反方向取自編譯期常數，每對僅交換一次
+                for q in ti.static(range(1, config.Q_3D)):
+                    if ti.static(q < _OPP[q]):
+                        temp = f[q, i, j, k]
+                        f[q, i, j, k] = f[_OPP[q], i, j, k]
+                        f[_OPP[q], i, j, k] = temp
     
     @ti.kernel  
-    def _apply_domain_boundaries(self):
+    def _apply_domain_boundaries(self, f: ti.template()):
         """
         計算域邊界 - outlet條件
         X和Y方向的自由流出邊界
+        
+        各面的參考節點偏移於編譯期固定 (恆為相鄰內部節點)，
+        無需執行期邊界檢查。
         """
         # X方向邊界
         for j, k in ti.ndrange(config.NY, config.NZ):
             # 左邊界 - outlet邊界條件
-            i = 0
-            if self.solid[i, j, k] == 0:
-                self._apply_outlet_extrapolation(i, j, k, i+1, j, k)
+            self._apply_outlet_extrapolation(f, 0, j, k, 1, 0, 0)
             
             # 右邊界 - outlet邊界條件
-            i = config.NX - 1
-            if self.solid[i, j, k] == 0:
-                self._apply_outlet_extrapolation(i, j, k, i-1, j, k)
+            self._apply_outlet_extrapolation(f, config.NX - 1, j, k, -1, 0, 0)
         
         # Y方向邊界
         for i, k in ti.ndrange(config.NX, config.NZ):
             # 前邊界 - outlet邊界條件
-            j = 0
-            if self.solid[i, j, k] == 0:
-                self._apply_outlet_extrapolation(i, j, k, i, j+1, k)
+            self._apply_outlet_extrapolation(f, i, 0, k, 0, 1, 0)
             
             # 後邊界 - outlet邊界條件
-            j = config.NY - 1
-            if self.solid[i, j, k] == 0:
-                self._apply_outlet_extrapolation(i, j, k, i, j-1, k)
+            self._apply_outlet_extrapolation(f, i, config.NY - 1, k, 0, -1, 0)
     
     @ti.func
-    def _apply_outlet_extrapolation(self, i: ti.i32, j: ti.i32, k: ti.i32,
-                                   ref_i: ti.i32, ref_j: ti.i32, ref_k: ti.i32):
+    def _apply_outlet_extrapolation(self, f: ti.template(), i: ti.i32, j: ti.i32, k: ti.i32,
+                                   di: ti.template(), dj: ti.template(), dk: ti.template()):
         """
         Outlet邊界外推實現
-        從參考節點外推密度和速度
+        從參考節點 (i+di, j+dj, k+dk) 外推密度和速度
+        
+        偏移為編譯期常數且指向域內相鄰節點，故僅需檢查固體標記。
         """
-        if (0 <= ref_i < config.NX and 0 <= ref_j < config.NY and 
-            0 <= ref_k < config.NZ and self.solid[ref_i, ref_j, ref_k] == 0):
+        ref_i = i + di
+        ref_j = j + dj
+        ref_k = k + dk
+        if self.solid[i, j, k] == 0 and self.solid[ref_i, ref_j, ref_k] == 0:
             # 外推邊界條件：從內部節點外推密度和速度
-            self.rho[i, j, k] = self.rho[ref_i, ref_j, ref_k]
-            self.u[i, j, k] = self.u[ref_i, ref_j, ref_k]
+            rho_ref = self.rho[ref_i, ref_j, ref_k]
+            u_ref = self.u[ref_i, ref_j, ref_k]
+            self.rho[i, j, k] = rho_ref
+            self.u[i, j, k] = u_ref
             # 更新分佈函數為平衡分佈
-            for q in range(config.Q_3D):
-                self.f[q, i, j, k] = self._compute_equilibrium_safe(
-                    self.rho[i, j, k], self.u[i, j, k], q)
+            self._set_equilibrium_safe(f, i, j, k, rho_ref, u_ref)
     
     @ti.func
-    def _get_opposite_direction(self, q: ti.i32) -> ti.i32:
-        """獲取相反方向的索引"""
-        # D3Q19模型的相反方向映射
-        opposite = ti.Vector([0, 2, 1, 4, 3, 6, 5, 8, 7, 
-                             10, 9, 12, 11, 14, 13, 16, 15, 18, 17])
-        return opposite[q]
-     
+    def _set_equilibrium_safe(self, f: ti.template(), i: ti.i32, j: ti.i32, k: ti.i32,
+                              rho: ti.f32, u: ti.template()):
+        """
+        將格點分布函數設為安全化的平衡分佈 (邊界用)
+        
+        與 _compute_equilibrium_safe 相同的安全化規則 (密度範圍、Mach限制、
+        非有限值回退靜止態)，但每格點僅執行一次，19個方向以
+        _equilibrium_q 靜態展開並共用預先計算的u²。
+        """
+        # 密度安全化：限制在合理範圍內
+        rho_safe = ti.select((rho <= 0.0) | (rho > 10.0), 1.0, rho)
+        
+        # 速度安全化：Mach數限制
+        u_norm = u.norm()
+        u_safe = u
+        if u_norm > 0.3:
+            u_safe = u * (0.2 / u_norm)
+        
+        # 非有限速度回退到靜止態分布 (f_eq = w_q * rho)
+        u_sq = u_safe.dot(u_safe)
+        if u_sq != u_sq or u_sq > 1e10:
+            u_safe = ti.Vector([0.0, 0.0, 0.0])
+            u_sq = 0.0
+        
+        for q in ti.static(range(config.Q_3D)):
+            f[q, i, j, k] = self._equilibrium_q(q, rho_safe, u_safe, u_sq)
+    
     def get_velocity_magnitude(self) -> np.ndarray:
         """
         獲取3D速度場大小
@@ -1061,8 +984,22 @@ class LBMSolver:
             >>> u_mag = solver.get_velocity_magnitude()
             >>> print(f"最大速度: {u_mag.max():.3f} LU")
         """
-        u_data = self.u.to_numpy()
-        return np.sqrt(u_data[:,:,:,0]**2 + u_data[:,:,:,1]**2 + u_data[:,:,:,2]**2)
+        # 速度場複製至常駐host緩衝，避免每次呼叫重新配置 NX×NY×NZ×3 陣列
+        self._copy_velocity_to_host(self._u_host)
+        u_data = self._u_host
+        # 單次縮併計算|u|²並原地開根號，不產生逐分量暫存陣列
+        # (回傳新陣列：呼叫端常保留結果作為前一幀比較，不可共用緩衝)
+        u_mag = np.einsum('ijkl,ijkl->ijk', u_data, u_data)
+        np.sqrt(u_mag, out=u_mag)
+        return u_mag
+    
+    @ti.kernel
+    def _copy_velocity_to_host(self, arr: ti.types.ndarray()):
+        """將速度場寫入預先配置的host陣列 [NX×NY×NZ×3]"""
+        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
+            u_local = self.u[i, j, k]
+            for d in ti.static(range(3)):
+                arr[i, j, k, d] = u_local[d]
     
     @ti.kernel
     def init_fields(self):
@@ -1093,6 +1030,7 @@ class LBMSolver:
             - 並行初始化所有格點
             - 避免memory race conditions
         """
+        ti.loop_config(block_dim=_BLOCK_DIM)
         for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
             # 初始化密度場 - 參考密度
             self.rho[i, j, k] = 1.0
@@ -1106,10 +1044,10 @@ class LBMSolver:
             # 初始化體力場 - 零初值
             self.body_force[i, j, k] = ti.Vector([0.0, 0.0, 0.0])
             
-            # 初始化分佈函數為平衡態
-            for q in range(config.Q_3D):
-                self.f[q, i, j, k] = self.w[q] * self.rho[i, j, k]
-                self.f_new[q, i, j, k] = self.f[q, i, j, k]
+            # 初始化分佈函數為平衡態 (ρ=1, u=0 時 f_q = w_q，立即數直接寫入，不回讀場)
+            for q in ti.static(range(config.Q_3D)):
+                self.f[q, i, j, k] = _W[q]
+                self.f_new[q, i, j, k] = _W[q]
     
     # ====================
     # 統一速度場存取介面 (CFD一致性優化)
@@ -1230,24 +1168,33 @@ class LBMSolver:
         """
         重置LBM求解器狀態
         
-        清空所有場變數並恢復初始狀態
+        清空所有場變數並恢復初始狀態；分布函數直接回到ρ=1、u=0的
+        平衡態，重置後無需再呼叫 init_fields
         """
         print("🔄 重置LBM求解器...")
         
-        # 重置場變數
-        self.f.fill(0.0)
-        self.f_new.fill(0.0)
-        self.rho.fill(1.0)  # 預設密度
-        self.u.fill(0.0)    # 零速度
-        
-        if hasattr(self, 'phase'):
-            self.phase.fill(0.0)  # 空氣相
-        
-        if hasattr(self, 'solid'):
-            self.solid.fill(0)    # 全部流體
+        # 重置場變數 (單一kernel一次走訪)
+        self._reset_all_fields(self.f, self.f_new)
         
         print("✅ LBM求解器重置完成")
     
+    @ti.kernel
+    def _reset_all_fields(self, f: ti.template(), f_new: ti.template()):
+        """
+        融合重置kernel：密度1.0、速度0、空氣相、全部流體，
+        分布函數直接設為對應的靜止平衡態 f_q = w_q
+        """
+        ti.loop_config(block_dim=_BLOCK_DIM)
+        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
+            for q in ti.static(range(config.Q_3D)):
+                f[q, i, j, k] = _W[q]
+                f_new[q, i, j, k] = _W[q]
+            self.rho[i, j, k] = 1.0  # 預設密度
+            self.u[i, j, k] = ti.Vector([0.0, 0.0, 0.0])  # 零速度
+            self.u_sqr[i, j, k] = 0.0
+            self.phase[i, j, k] = 0.0  # 空氣相
+            self.solid[i, j, k] = ti.u8(0)  # 全部流體
+    
     # ==============================================
     # Phase 3: 溫度依賴物性支援
     # ==============================================
@@ -1279,6 +1226,8 @@ class LBMSolver:
         else:
             self.use_buoyancy = False
         
+        self._configure_coupled_step()
+        
         print("✅ Phase 3 溫度依賴物性支援已啟用")
     
     def update_properties_from_temperature(self, temperature_field):
@@ -1293,12 +1242,12 @@ class LBMSolver:
             return
         
         if self.use_temperature_dependent_properties and self.properties_calculator:
-            # 1. 首先更新物性場
-            self.properties_calculator.update_properties_from_temperature(temperature_field)
-            
-            # 2. 立即同步密度場 (如果啟用且有物性計算器)
-            if self.variable_density and self.properties_calculator:
-                self._update_density_field()
+            # 1-2. 更新物性場；啟用可變密度時於同一kernel同步LBM密度場
+            if self.variable_density:
+                self.properties_calculator.update_properties_and_density(
+                    temperature_field, self.rho)
+            else:
+                self.properties_calculator.update_properties_from_temperature(temperature_field)
             
             # 3. 更新浮力場 (如果啟用)
             if self.use_buoyancy and self.buoyancy_system:
@@ -1321,6 +1270,9 @@ class LBMSolver:
         
         Args:
             temperature_field: 溫度場 (用於物性更新)
+            
+        Returns:
+            bool: 時間步是否成功完成
         """
         
         # 🔄 修正的更新時序
@@ -1332,95 +1284,153 @@ class LBMSolver:
         if self.use_les and self.les_model is not None:
             self.les_model.update_turbulent_viscosity(self.u)
         
-        # 3. 使用可變物性的collision-streaming運算
-        if hasattr(self, 'use_temperature_dependent_properties') and self.use_temperature_dependent_properties:
-            self._collision_streaming_step_with_variable_properties()
-        else:
-            # 回退到標準collision-streaming
-            self._collision_streaming_step()
+        # 3. collision-streaming運算 (分派於配置時決定；可變物性路徑融合浮力源項)
+        self._coupled_collision_step()
         
-        # 4. 在streaming後應用浮力項
-        if self.use_buoyancy and self.buoyancy_system:
-            self.buoyancy_system.apply_buoyancy_to_distribution(
-                self.f, self.f_new, self.rho, self.u,
-                self.cx, self.cy, self.cz, self.w  # 傳遞LBM常數
-            )
+        # 4. 標準步驟路徑：在streaming後應用浮力項
+        if self._coupled_buoyancy_step is not None:
+            self._coupled_buoyancy_step()
         
-        # 5. 邊界條件處理
+        # 5. 邊界條件處理 (備用方案亦失敗時視為步驟失敗)
         try:
             self.boundary_manager.apply_all_boundaries(self)
         except Exception as e:
             print(f"⚠️  邊界條件應用失敗: {e}")
-            self.apply_boundary_conditions()
+            try:
+                self.apply_boundary_conditions()
+            except Exception as fallback_error:
+                print(f"❌ 備用邊界條件亦失敗: {fallback_error}")
+                return False
+        
+        # 6. 數值有效性檢查 (讀取0維場時同步裝置，僅回傳一個純量)
+        self._count_invalid_macroscopic()
+        invalid_count = int(self._invalid_count[None])
+        if invalid_count > 0:
+            print(f"❌ 巨觀量出現 {invalid_count} 個無效流體格點 (NaN/Inf 或 ρ≤0)")
+            return False
+        
+        return True
     
     @ti.kernel
-    def _collision_streaming_step_with_variable_properties(self):
+    def _count_invalid_macroscopic(self):
+        """統計 ρ 非正或 ρ/u 為NaN/Inf 的流體格點數至 _invalid_count"""
+        self._invalid_count[None] = 0
+        
+        ti.loop_config(block_dim=_BLOCK_DIM)
+        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
+            rho = self.rho[i, j, k]
+            u_sqr = self.u[i, j, k].norm_sqr()
+            invalid = (ti.math.isnan(rho) or ti.math.isinf(rho) or rho <= 0.0 or
+                       ti.math.isnan(u_sqr) or ti.math.isinf(u_sqr))
+            self._invalid_count[None] += ti.select(invalid and self.solid[i, j, k] == 0, 1, 0)
+    
+    def _variable_properties_step(self) -> None:
+        """
+        可變物性collision-streaming步驟 (雙緩衝ping-pong)
+        
+        融合kernel自 f 讀取、寫入 f_new，完成後以 swap_fields() 交換參考，
+        不再有獨立的streaming回寫pass。啟用浮力時，浮力源項亦於同一kernel
+        內加入，省去獨立浮力kernel對 f/rho/u 的整場讀寫。
         """
-        包含可變物性的collision-streaming步驟
+        self._collision_streaming_step_with_variable_properties(
+            self.f, self.f_new, self._fused_buoyancy)
+        self.swap_fields()
+    
+    def _apply_standalone_buoyancy(self) -> None:
+        """標準步驟後的獨立浮力kernel (步驟已交換緩衝，最新分布函數位於 self.f)"""
+        self.buoyancy_system.apply_buoyancy_to_distribution(
+            self.f_new, self.f, self.rho, self.u,
+            self.cx, self.cy, self.cz, self.w  # 傳遞LBM常數
+        )
+    
+    def _buoyancy_active(self) -> bool:
+        """浮力系統是否啟用"""
+        return bool(getattr(self, 'use_buoyancy', False) and
+                    getattr(self, 'buoyancy_system', None) is not None)
+    
+    def _configure_coupled_step(self) -> None:
         """
+        解析 step_with_temperature_coupling 的執行路徑並快取綁定方法
         
-        # 備份當前分布函數 - 修正索引順序以匹配定義
-        for i, j, k, q in ti.ndrange(config.NX, config.NY, config.NZ, config.Q_3D):
-            self.f_old[i, j, k, q] = self.f[q, i, j, k]  # 源為 [q, i, j, k]
+        物性與浮力開關僅於配置時改變，每步不再重複 hasattr/getattr 判斷。
+        """
+        variable = bool(getattr(self, 'use_temperature_dependent_properties', False))
+        buoyancy = self._buoyancy_active()
         
-        # Collision step with variable properties
-        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            # 計算局部巨觀量
-            rho_local = 0.0
-            u_local = ti.Vector([0.0, 0.0, 0.0])
-            
-            for q in ti.static(range(config.Q_3D)):
-                rho_local += self.f[q, i, j, k]
-            
-            if rho_local > 1e-10:
-                for q in ti.static(range(config.Q_3D)):
-                    # 使用已定義的速度向量陣列
-                    e_q = ti.Vector([self.cx[q], self.cy[q], self.cz[q]])
-                    u_local += e_q * self.f[q, i, j, k]
-                u_local /= rho_local
-            
-            # 更新巨觀場
-            self.rho[i, j, k] = rho_local
-            self.u[i, j, k] = u_local
-            
-            # 獲取局部鬆弛時間 (修正版)
-            tau_local = config.TAU_WATER  # 默認值
-            
-            # 如果啟用可變黏度，使用局部鬆弛時間 (使用布爾標志)
-            if self.variable_viscosity:
-                # 安全獲取局部鬆弛時間
-                tau_local = self.properties_calculator.relaxation_time_field[i, j, k]
-                
-                # 數值穩定性檢查和限制
-                tau_local = ti.max(0.52, ti.min(tau_local, 1.8))
-            
-            # BGK collision with variable tau
-            omega_local = 1.0 / tau_local
-            
-            for q in ti.static(range(config.Q_3D)):
-                # 計算平衡分布函數
-                f_eq = self._compute_equilibrium(q, rho_local, u_local)
-                
-                # BGK collision
-                self.f_new[q, i, j, k] = (self.f[q, i, j, k] - 
-                                        omega_local * (self.f[q, i, j, k] - f_eq))
+        if variable:
+            self._coupled_collision_step = self._variable_properties_step
+            self._fused_buoyancy = buoyancy
+            self._coupled_buoyancy_step = None
+        else:
+            # 回退到標準collision-streaming
+            self._coupled_collision_step = self._collision_streaming_step
+            self._fused_buoyancy = False
+            self._coupled_buoyancy_step = self._apply_standalone_buoyancy if buoyancy else None
+    
+    @ti.kernel
+    def _collision_streaming_step_with_variable_properties(self, f: ti.template(), f_new: ti.template(),
+                                                           with_buoyancy: ti.template()):
+        """
+        包含可變物性的collision-streaming融合步驟
         
-        # Streaming step
+        與 _apply_collision_and_streaming 相同採pull形式：每個格點自上游鄰點
+        收集分布函數 (含bounce-back)，計算巨觀量與局部鬆弛時間後，
+        將post-collision值寫入 f_new。每步僅讀寫分布函數各一次。
+        
+        Args:
+            f: 來源分布函數場 (post-collision, 上一步)
+            f_new: 目標分布函數場
+            with_buoyancy: 編譯期旗標，為True時於collision後加入浮力Guo源項
+        """
+        ti.loop_config(block_dim=_BLOCK_DIM)
         for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            for q in ti.static(range(config.Q_3D)):
-                # 計算源位置 - 使用已定義的離散速度
-                src_i = i - self.cx[q]
-                src_j = j - self.cy[q]
-                src_k = k - self.cz[q]
+            if self.solid[i, j, k] == 0:
+                # Pull streaming
+                f_local = self._pull_populations(f, i, j, k)
                 
-                # 邊界檢查和streaming
-                if (0 <= src_i < config.NX and 
-                    0 <= src_j < config.NY and 
-                    0 <= src_k < config.NZ):
-                    self.f[q, i, j, k] = self.f_new[q, src_i, src_j, src_k]
+                # 計算局部巨觀量
+                rho_local, u_local = self._compute_moments(f_local)
+                
+                if rho_local > 1e-10:
+                    u_local /= rho_local
                 else:
-                    # 邊界處理
-                    self.f[q, i, j, k] = self.f_new[q, i, j, k]
+                    u_local = ti.Vector([0.0, 0.0, 0.0])
+                
+                # 更新巨觀場
+                self.rho[i, j, k] = rho_local
+                self.u[i, j, k] = u_local
+                
+                # 鬆弛頻率：默認值為Python常數運算，追蹤時即摺疊為立即數
+                omega_local = 1.0 / config.TAU_WATER
+                
+                # 如果啟用可變黏度，使用局部鬆弛時間 (布爾標志於編譯期決定分支)
+                if ti.static(self.variable_viscosity):
+                    # 安全獲取局部鬆弛時間
+                    tau_local = self.properties_calculator.relaxation_time_field[i, j, k]
+                    
+                    # 數值穩定性檢查和限制
+                    tau_local = ti.max(0.52, ti.min(tau_local, 1.8))
+                    omega_local = 1.0 / tau_local
+                
+                # BGK collision with variable tau
+                u_sq = u_local.dot(u_local)
+                
+                for q in ti.static(range(config.Q_3D)):
+                    f_eq = self._equilibrium_q(q, rho_local, u_local, u_sq)
+                    f_new[q, i, j, k] = f_local[q] - omega_local * (f_local[q] - f_eq)
+                
+                # 浮力源項 (與 apply_buoyancy_to_distribution 相同離散)
+                if ti.static(with_buoyancy):
+                    if rho_local > 1e-10:
+                        F_b = self.buoyancy_system.buoyancy_force[i, j, k]
+                        for q in ti.static(range(config.Q_3D)):
+                            e_q = ti.Vector([_CX[q], _CY[q], _CZ[q]], ti.f32)
+                            f_new[q, i, j, k] += self.buoyancy_system.buoyancy_source(
+                                e_q, _W[q], u_local, F_b)
+            else:
+                # 固體格點保持原值，確保交換後兩緩衝一致
+                for q in ti.static(range(config.Q_3D)):
+                    f_new[q, i, j, k] = f[q, i, j, k]
     
     def get_temperature_coupling_diagnostics(self):
         """
@@ -1458,19 +1468,6 @@ class LBMSolver:
         
         return diagnostics
     
-    @ti.kernel
-    def _update_density_field(self):
-        """
-        從溫度依賴物性計算器同步密度場到LBM求解器
-        
-        必須在properties_calculator.update_properties_from_temperature()後調用
-        用於支援溫度依賴密度的強耦合系統
-        """
-        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            # 直接從物性計算器的密度場同步到LBM密度場
-            # 注意：這個方法僅在properties_calculator存在時調用
-            self.rho[i, j, k] = self.properties_calculator.density_field[i, j, k]
-
     # ======================================================================
     # Phase 2 強耦合系統 - 顆粒反作用力集成
     # ======================================================================
@@ -1478,6 +1475,7 @@ class LBMSolver:
     @ti.kernel
     def add_particle_reaction_forces(self, particle_system: ti.template()):
         """將顆粒反作用力加入LBM體力項 - 路線圖核心集成方法"""
+        ti.loop_config(block_dim=_BLOCK_DIM)
         for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
             if self.solid[i, j, k] == 0:  # 只在流體區域
                 self.body_force[i, j, k] += particle_system.reaction_force_field[i, j, k]
@@ -1523,16 +1521,37 @@ class LBMSolver:
         
         return diagnostics
     
+    def max_velocity_squared(self) -> float:
+        """速度場最大 |u|² (裝置端歸約，僅回傳純量)"""
+        self._reduce_max_velocity_squared()
+        return float(self._max_v2[None])
+    
     @ti.kernel
-    def _compute_body_force_magnitude(self) -> ti.f32:
+    def _reduce_max_velocity_squared(self):
+        """歸約速度場最大 |u|² 至 _max_v2"""
+        self._max_v2[None] = 0.0
+        for I in ti.grouped(self.u):
+            ti.atomic_max(self._max_v2[None], self.u[I].norm_sqr())
+    
+    def _compute_body_force_magnitude(self) -> float:
         """計算體力場的平均幅值"""
-        total_magnitude = 0.0
-        count = 0
+        self._reduce_body_force_magnitude()
+        count = max(1, int(self._body_force_fluid_count[None]))
+        return float(self._body_force_mag_sum[None]) / count
+    
+    @ti.kernel
+    def _reduce_body_force_magnitude(self):
+        """
+        流體格點體力幅值與數量的並行歸約
         
-        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            if self.solid[i, j, k] == 0:
-                magnitude = self.body_force[i, j, k].norm()
-                total_magnitude += magnitude
-                count += 1
+        累加至0維場，Taichi將其編譯為執行緒區域部分和再一次性
+        合併，避免逐格點的全域原子加；固體格點以select貢獻0。
+        """
+        self._body_force_mag_sum[None] = 0.0
+        self._body_force_fluid_count[None] = 0
         
-        return total_magnitude / ti.max(1, count)
+        ti.loop_config(block_dim=_BLOCK_DIM)
+        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
+            fluid = self.solid[i, j, k] == 0
+            self._body_force_mag_sum[None] += ti.select(fluid, self.body_force[i, j, k].norm(), 0.0)
+            self._body_force_fluid_count[None] += ti.select(fluid, 1, 0)
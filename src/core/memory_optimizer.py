@@ -7,10 +7,39 @@ Cache-line對齊、預取優化、統一記憶體池管理
 import taichi as ti
 import numpy as np
 import config as config
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Mapping
+from types import MappingProxyType
 import gc
 import psutil
 
+# 各運算類型的記憶體訪問模式 (不可變，模組載入時建立一次)
+_ACCESS_PATTERNS = MappingProxyType({
+    'collision': MappingProxyType({
+        'access_pattern': 'spatial_3d',
+        'prefetch_distance': 2,
+        'block_size': 128,  # M3最佳
+        'vectorization': 'enabled'
+    }),
+    'streaming': MappingProxyType({
+        'access_pattern': 'directional',
+        'prefetch_distance': 3,
+        'block_size': 64,
+        'vectorization': 'streaming'
+    }),
+    'macroscopic': MappingProxyType({
+        'access_pattern': 'sequential',
+        'prefetch_distance': 4,
+        'block_size': 256,
+        'vectorization': 'reduction'
+    }),
+    'boundary': MappingProxyType({
+        'access_pattern': 'sparse',
+        'prefetch_distance': 1,
+        'block_size': 32,
+        'vectorization': 'conditional'
+    }),
+})
+
 class AppleSiliconMemoryOptimizer:
     """
     Apple Silicon專用記憶體最佳化引擎
@@ -136,7 +165,7 @@ class AppleSiliconMemoryOptimizer:
         if total_memory_mb > self.unified_memory_gb * 1024 * 0.1:  # 超過10%
             print(f"    ⚠️  大記憶體使用 ({total_memory_mb:.1f}MB)，啟用分頁管理")
     
-    def optimize_access_pattern(self, operation_type: str) -> dict:
+    def optimize_access_pattern(self, operation_type: str) -> Mapping[str, object]:
         """
         優化記憶體訪問模式
         
@@ -144,36 +173,9 @@ class AppleSiliconMemoryOptimizer:
             operation_type: 'collision', 'streaming', 'macroscopic', 'boundary'
         
         Returns:
-            最佳化配置
+            最佳化配置 (模組層級唯讀表，未知類型回退為collision)
         """
-        patterns = {
-            'collision': {
-                'access_pattern': 'spatial_3d',
-                'prefetch_distance': 2,
-                'block_size': 128,  # M3最佳
-                'vectorization': 'enabled'
-            },
-            'streaming': {
-                'access_pattern': 'directional',
-                'prefetch_distance': 3,
-                'block_size': 64,
-                'vectorization': 'streaming'
-            },
-            'macroscopic': {
-                'access_pattern': 'sequential',
-                'prefetch_distance': 4,
-                'block_size': 256,
-                'vectorization': 'reduction'
-            },
-            'boundary': {
-                'access_pattern': 'sparse',
-                'prefetch_distance': 1,
-                'block_size': 32,
-                'vectorization': 'conditional'
-            }
-        }
-        
-        return patterns.get(operation_type, patterns['collision'])
+        return _ACCESS_PATTERNS.get(operation_type, _ACCESS_PATTERNS['collision'])
     
     def create_optimized_lbm_fields(self) -> dict:
         """
@@ -49,12 +49,17 @@ class NumericalStabilityMonitor:
         
         print("✅ 數值穩定性監控器初始化完成")
     
-    @ti.kernel  
-    def check_field_stability(self, solver: ti.template()) -> ti.i32:
+    def check_field_stability(self, solver) -> int:
         """
         檢查LBM場的數值穩定性
         返回值: 0=正常, 1=警告, 2=嚴重錯誤
         """
+        # 分布函數以參數傳入：求解器以參考交換 f/f_new，kernel內讀 solver.f 會綁定舊場
+        return self._check_field_stability_kernel(solver, solver.f)
+    
+    @ti.kernel  
+    def _check_field_stability_kernel(self, solver: ti.template(), f: ti.template()) -> ti.i32:
+        """檢查LBM場數值穩定性的kernel實作"""
         # 初始化統計值
         self.max_velocity[None] = 0.0
         self.min_density[None] = 1e10
@@ -89,7 +94,7 @@ class NumericalStabilityMonitor:
                 
                 # 檢查分佈函數
                 for q in range(config.Q_3D):
-                    f_val = solver.f[q, i, j, k]
+                    f_val = f[q, i, j, k]
                     if ti.math.isnan(f_val):
                         self.nan_count[None] += 1
                     elif ti.math.isinf(f_val):
@@ -161,11 +166,15 @@ class NumericalStabilityMonitor:
                 'is_stable': False
             }
     
-    @ti.kernel
-    def emergency_stabilization(self, solver: ti.template()):
+    def emergency_stabilization(self, solver):
         """
         緊急數值穩定化 - 將異常值重置為安全值
         """
+        self._emergency_stabilization_kernel(solver, solver.f)
+    
+    @ti.kernel
+    def _emergency_stabilization_kernel(self, solver: ti.template(), f: ti.template()):
+        """緊急數值穩定化的kernel實作"""
         for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
             if solver.solid[i, j, k] == 0:  # 流體節點
                 # 修復密度
@@ -190,10 +199,10 @@ class NumericalStabilityMonitor:
                 u_safe = solver.u[i, j, k]
                 
                 for q in range(config.Q_3D):
-                    f_val = solver.f[q, i, j, k]
+                    f_val = f[q, i, j, k]
                     if ti.math.isnan(f_val) or ti.math.isinf(f_val):
                         # 重置為平衡分佈
-                        solver.f[q, i, j, k] = solver._compute_stable_equilibrium(
+                        f[q, i, j, k] = solver._compute_stable_equilibrium(
                             q, rho_safe, u_safe)
     
     def get_statistics(self) -> dict:
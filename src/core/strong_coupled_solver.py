@@ -20,6 +20,7 @@ Phase 3: 雙向強耦合系統主控制器
 
 import taichi as ti
 import numpy as np
+import math
 import time
 from typing import Dict, Any, Tuple, Optional
 from dataclasses import dataclass
@@ -39,6 +40,7 @@ class StrongCouplingConfig:
     coupling_frequency: int = 1          # 耦合頻率 (每N步)
     max_coupling_iterations: int = 3     # 最大耦合迭代次數
     coupling_tolerance: float = 1e-4     # 耦合收斂容差
+    property_skip_tolerance: float = 1e-3  # 溫度殘差低於此值時沿用上一迭代物性
     
     # 穩定性控制
     enable_adaptive_relaxation: bool = True    # 自適應鬆弛
@@ -54,6 +56,7 @@ class StrongCouplingConfig:
     # 診斷和監控
     enable_diagnostics: bool = True           # 診斷監控
     stability_check_frequency: int = 10       # 穩定性檢查頻率
+    timing_sample_interval: int = 64          # 分段計時取樣間隔 (步)
     max_temperature_change: float = 5.0       # 最大溫度變化 (°C/步)
     max_velocity_magnitude: float = 0.3       # 最大速度 (格子單位)
     
@@ -82,6 +85,22 @@ class StrongCoupledSolver:
     - 多物理場數值穩定性保證
     """
     
+    # 性能計時索引 (對應 performance_stats 的鍵)
+    _FLUID_TIME, _THERMAL_TIME, _PROPERTY_TIME, _BUOYANCY_TIME = range(4)
+    _TIME_KEYS = ('fluid_time', 'thermal_time', 'property_update_time', 'buoyancy_time')
+    
+    # 耦合迭代次數統計窗口：固定長度環形緩衝，O(1)寫入與平均
+    COUPLING_ITERATION_WINDOW = 4096
+    
+    # 穩定性歷史：固定長度環形緩衝，各量連續存放
+    STABILITY_HISTORY_LENGTH = 50
+    STABILITY_HISTORY_DTYPE = np.dtype([
+        ('temperature_changes', 'f4'),
+        ('velocity_magnitudes', 'f4'),
+        ('coupling_residuals', 'f4'),
+        ('rayleigh_numbers', 'f4'),
+    ])
+    
     def __init__(self, 
                  coupling_config: StrongCouplingConfig = None,
                  thermal_diffusivity: float = 1.6e-7):
@@ -107,23 +126,20 @@ class StrongCoupledSolver:
         self.is_converged = False
         self.current_relaxation = self.config.relaxation_factor
         
-        # 性能統計
-        self.performance_stats = {
-            'fluid_time': 0.0,
-            'thermal_time': 0.0,
-            'property_update_time': 0.0,
-            'buoyancy_time': 0.0,
-            'coupling_iterations': [],
-            'total_steps': 0
-        }
+        # 性能統計 (取樣步的各子系統累計耗時，以 _FLUID_TIME 等索引)
+        self._perf_times = np.zeros(len(self._TIME_KEYS), dtype=np.float64)
+        self._total_steps = 0
+        self._timed_steps = 0
+        self._reset_coupling_iteration_ring()
+        
+        # 耦合收斂檢查：前一迭代溫度場 (首次檢查時配置) 與殘差歸約
+        self._T_prev_field = None
+        self._last_residual = float('inf')
+        self._buoyancy_dirty = True  # 溫度/流場自上次浮力計算後是否變動
+        self._residual = ti.field(dtype=ti.f64, shape=())  # f64累加：千萬格點求和不受f32捨入影響收斂判斷
         
         # 穩定性監控
-        self.stability_history = {
-            'temperature_changes': [],
-            'velocity_magnitudes': [],
-            'coupling_residuals': [],
-            'rayleigh_numbers': []
-        }
+        self._reset_stability_history()
         
         print("✅ Phase 3強耦合系統初始化完成")
     
@@ -210,6 +226,7 @@ class StrongCoupledSolver:
                 self.fluid_solver.rho,
                 self.fluid_solver.u
             )
+            self._buoyancy_dirty = False
         
         print("✅ 初始物性耦合完成")
     
@@ -225,86 +242,143 @@ class StrongCoupledSolver:
             print("❌ 錯誤：強耦合系統未初始化")
             return False
         
-        step_start_time = time.time()
+        # 子系統以回傳值報告失敗；例外僅於整步外層捕捉一次
+        try:
+            return self._run_coupled_step()
+        except Exception as e:
+            print(f"❌ 步驟{self.coupling_step}: 耦合步驟異常: {e}")
+            return False
+    
+    def _run_coupled_step(self) -> bool:
+        """強耦合時間步主體 (耦合迭代、穩定性檢查與統計)"""
+        
         self.is_converged = False
         coupling_iterations = 0
+        # 物性沿用判斷僅依本步收斂檢查的殘差 (上一步殘差不代表本步迭代間變化)
+        self._last_residual = float('inf')
+        
+        # 迴圈內常用配置預先綁定為區域變數
+        cfg = self.config
+        refresh_properties = cfg.coupling_frequency == 1
+        property_tol = cfg.property_skip_tolerance
+        enable_buoyancy = cfg.enable_buoyancy and self.buoyancy_system is not None
+        coupling_tol = cfg.coupling_tolerance
+        # 分段計時需同步裝置，僅於診斷開啟時低頻取樣，其餘步保持核心非同步排隊
+        sample_timing = (cfg.enable_diagnostics and
+                         self.coupling_step % cfg.timing_sample_interval == 0)
         
         # 耦合迭代循環
-        for iteration in range(self.config.max_coupling_iterations):
+        for iteration in range(cfg.max_coupling_iterations):
             coupling_iterations += 1
             
-            # 1. 物性更新
-            if iteration == 0 or self.config.coupling_frequency == 1:
-                property_start = time.time()
+            # 1. 物性更新 (迭代間溫度幾乎不變時沿用上一迭代物性場)
+            if iteration == 0 or (refresh_properties and self._last_residual > property_tol):
+                if sample_timing:
+                    t0 = self._phase_clock()
                 success = self._update_temperature_dependent_properties()
                 if not success:
                     print(f"❌ 步驟{self.coupling_step}: 物性更新失敗")
                     return False
-                self.performance_stats['property_update_time'] += time.time() - property_start
+                if sample_timing:
+                    self._perf_times[self._PROPERTY_TIME] += self._phase_clock() - t0
             
-            # 2. 浮力更新
-            if self.config.enable_buoyancy and self.buoyancy_system:
-                buoyancy_start = time.time()
-                buoyancy_diag = self.buoyancy_system.update_buoyancy_system(
+            # 2. 浮力更新 (僅在溫度/流場於上次浮力計算後有變動時)
+            if enable_buoyancy and self._buoyancy_dirty:
+                if sample_timing:
+                    t0 = self._phase_clock()
+                self.buoyancy_system.update_buoyancy_system(
                     self.thermal_solver.temperature,
                     self.fluid_solver.rho,
                     self.fluid_solver.u
                 )
-                self.performance_stats['buoyancy_time'] += time.time() - buoyancy_start
+                self._buoyancy_dirty = False
+                if sample_timing:
+                    self._perf_times[self._BUOYANCY_TIME] += self._phase_clock() - t0
             
             # 3. 流體步驟
-            fluid_start = time.time()
-            try:
-                self.fluid_solver.step_with_temperature_coupling(
-                    self.thermal_solver.temperature
-                )
-                fluid_success = True
-            except Exception as e:
-                print(f"❌ 流體求解器異常: {e}")
-                fluid_success = False
-            
+            if sample_timing:
+                t0 = self._phase_clock()
+            fluid_success = self.fluid_solver.step_with_temperature_coupling(
+                self.thermal_solver.temperature
+            )
             if not fluid_success:
                 print(f"❌ 步驟{self.coupling_step}: 流體求解失敗")
                 return False
-            self.performance_stats['fluid_time'] += time.time() - fluid_start
+            self._buoyancy_dirty = True  # ρ、u 已更新
+            if sample_timing:
+                self._perf_times[self._FLUID_TIME] += self._phase_clock() - t0
             
             # 4. 速度場傳遞
             velocity_field = self.fluid_solver.get_velocity_field_for_thermal_coupling()
             self.thermal_solver.set_velocity_field(velocity_field)
             
             # 5. 熱傳步驟
-            thermal_start = time.time()
+            if sample_timing:
+                t0 = self._phase_clock()
             thermal_success = self.thermal_solver.step()
             if not thermal_success:
                 print(f"❌ 步驟{self.coupling_step}: 熱傳求解失敗")
                 return False
-            self.performance_stats['thermal_time'] += time.time() - thermal_start
+            if sample_timing:
+                self._perf_times[self._THERMAL_TIME] += self._phase_clock() - t0
             
             # 6. 收斂性檢查
             if iteration > 0:
                 convergence_residual = self._check_coupling_convergence()
-                if convergence_residual < self.config.coupling_tolerance:
+                if convergence_residual < coupling_tol:
                     self.is_converged = True
                     break
         
         # 7. 穩定性檢查
-        if self.coupling_step % self.config.stability_check_frequency == 0:
+        if self.coupling_step % cfg.stability_check_frequency == 0:
             stability_ok = self._check_system_stability()
             if not stability_ok:
                 print(f"❌ 步驟{self.coupling_step}: 系統穩定性檢查失敗")
                 return False
         
         # 8. 自適應鬆弛調節
-        if self.config.enable_adaptive_relaxation:
+        if cfg.enable_adaptive_relaxation:
             self._adaptive_relaxation_control(coupling_iterations)
         
         # 更新統計
-        self.performance_stats['coupling_iterations'].append(coupling_iterations)
-        self.performance_stats['total_steps'] += 1
+        self._record_coupling_iterations(coupling_iterations)
+        self._total_steps += 1
+        if sample_timing:
+            self._timed_steps += 1
         self.coupling_step += 1
         
         return True
     
+    @property
+    def performance_stats(self) -> Dict[str, Any]:
+        """性能統計字典 (相容舊介面，由計時陣列即時組成)"""
+        stats = dict(zip(self._TIME_KEYS, self._perf_times.tolist()))
+        stats['total_steps'] = self._total_steps
+        stats['timed_steps'] = self._timed_steps
+        return stats
+    
+    @staticmethod
+    def _phase_clock() -> float:
+        """同步裝置後讀取時鐘，使分段計時涵蓋已排隊的核心"""
+        ti.sync()
+        return time.perf_counter()
+    
+    def _reset_coupling_iteration_ring(self):
+        """清空耦合迭代次數環形緩衝"""
+        self._iter_ring = np.zeros(self.COUPLING_ITERATION_WINDOW, dtype=np.int32)
+        self._iter_head = 0
+        self._iter_count = 0
+        self._iter_sum = 0
+        self._iter_total = 0  # 全程累計 (不受窗口限制)
+    
+    def _record_coupling_iterations(self, coupling_iterations: int):
+        """記錄一步的耦合迭代次數，維護最近窗口內與全程的總和"""
+        self._iter_sum += coupling_iterations - int(self._iter_ring[self._iter_head])
+        self._iter_total += coupling_iterations
+        self._iter_ring[self._iter_head] = coupling_iterations
+        self._iter_head = (self._iter_head + 1) % self._iter_ring.size
+        self._iter_count = min(self._iter_count + 1, self._iter_ring.size)
+    
     def _update_temperature_dependent_properties(self) -> bool:
         """
         更新溫度依賴物性
@@ -339,17 +413,31 @@ class StrongCoupledSolver:
             收斂殘差
         """
         
-        # 簡化的收斂檢查：溫度場變化
-        T_current = self.thermal_solver.temperature.to_numpy()
-        T_old = getattr(self, '_T_previous', T_current)
+        # 簡化的收斂檢查：溫度場變化 (裝置端歸約，僅回傳純量)
+        temperature = self.thermal_solver.temperature
         
-        # 計算殘差
-        residual = np.mean(np.abs(T_current - T_old))
+        if self._T_prev_field is None:
+            # 首次呼叫：尚無前一迭代可比較，保存當前狀態並視為未收斂
+            self._T_prev_field = ti.field(dtype=temperature.dtype, shape=temperature.shape)
+            self._T_prev_field.copy_from(temperature)
+            self._last_residual = float('inf')
+            return self._last_residual
         
-        # 保存當前狀態
-        self._T_previous = T_current.copy()
+        # 計算殘差並保存當前狀態
+        self._temperature_residual_kernel(temperature, self._T_prev_field)
+        residual = self._residual[None] / temperature.shape[0] / temperature.shape[1] / temperature.shape[2]
+        self._last_residual = float(residual)
         
-        return float(residual)
+        return self._last_residual
+    
+    @ti.kernel
+    def _temperature_residual_kernel(self, T: ti.template(), T_prev: ti.template()):
+        """累加 Σ|T - T_prev| 至 _residual，並以當前溫度覆寫 T_prev"""
+        self._residual[None] = 0.0
+        for I in ti.grouped(T):
+            T_local = T[I]
+            ti.atomic_add(self._residual[None], ti.cast(ti.abs(T_local - T_prev[I]), ti.f64))
+            T_prev[I] = T_local
     
     def _check_system_stability(self) -> bool:
         """
@@ -358,6 +446,7 @@ class StrongCoupledSolver:
         Returns:
             True: 穩定, False: 不穩定
         """
+        cfg = self.config
         
         # 溫度範圍檢查
         T_min, T_max, T_avg = self.thermal_solver.get_temperature_stats()
@@ -367,34 +456,41 @@ class StrongCoupledSolver:
             return False
         
         # 溫度變化率檢查
-        if len(self.stability_history['temperature_changes']) > 0:
-            last_T_avg = self.stability_history['temperature_changes'][-1]
+        if self._stab_count > 0:
+            last_T_avg = self._stab['temperature_changes'][self._stab_head - 1]
             T_change_rate = abs(T_avg - last_T_avg)
             
-            if T_change_rate > self.config.max_temperature_change:
+            if T_change_rate > cfg.max_temperature_change:
                 print(f"⚠️  溫度變化過快: {T_change_rate:.2f}°C/步")
                 return False
         
-        # 速度量級檢查
-        velocity_magnitude = self.fluid_solver.get_velocity_magnitude()
-        max_vel = np.max(velocity_magnitude)
+        # 速度量級檢查 (裝置端求 max|u|²，僅回傳純量)
+        max_vel = math.sqrt(self.fluid_solver.max_velocity_squared())
         
-        if max_vel > self.config.max_velocity_magnitude:
+        if max_vel > cfg.max_velocity_magnitude:
             print(f"⚠️  速度過大: {max_vel:.3f} (格子單位)")
             return False
         
-        # 更新穩定性歷史
-        self.stability_history['temperature_changes'].append(T_avg)
-        self.stability_history['velocity_magnitudes'].append(max_vel)
-        
-        # 限制歷史長度
-        max_history = 50
-        for key in self.stability_history:
-            if len(self.stability_history[key]) > max_history:
-                self.stability_history[key] = self.stability_history[key][-max_history:]
+        # 更新穩定性歷史 (環形緩衝，覆寫最舊的一筆)
+        self._stab['temperature_changes'][self._stab_head] = T_avg
+        self._stab['velocity_magnitudes'][self._stab_head] = max_vel
+        self._stab_head = (self._stab_head + 1) % self._stab.size
+        self._stab_count = min(self._stab_count + 1, self._stab.size)
         
         return True
     
+    def _reset_stability_history(self):
+        """清空穩定性歷史環形緩衝"""
+        self._stab = np.zeros(self.STABILITY_HISTORY_LENGTH, dtype=self.STABILITY_HISTORY_DTYPE)
+        self._stab_head = 0
+        self._stab_count = 0
+    
+    def _recent_stability(self, name: str, n: int) -> list:
+        """依時間順序取出某量最近 n 筆穩定性歷史"""
+        n = min(n, self._stab_count)
+        indices = (self._stab_head - n + np.arange(n)) % self._stab.size
+        return self._stab[name][indices].tolist()
+    
     def _adaptive_relaxation_control(self, coupling_iterations: int):
         """
         自適應鬆弛控制
@@ -450,23 +546,24 @@ class StrongCoupledSolver:
             diagnostics['buoyancy_stats'] = self.buoyancy_system.get_natural_convection_diagnostics()
         
         # 性能統計
-        total_time = sum(self.performance_stats[key] for key in 
-                        ['fluid_time', 'thermal_time', 'property_update_time', 'buoyancy_time'])
+        total_time = float(self._perf_times.sum())
         
         if total_time > 0:
+            fractions = self._perf_times / total_time
             diagnostics['performance'] = {
-                'fluid_fraction': self.performance_stats['fluid_time'] / total_time,
-                'thermal_fraction': self.performance_stats['thermal_time'] / total_time,
-                'property_fraction': self.performance_stats['property_update_time'] / total_time,
-                'buoyancy_fraction': self.performance_stats['buoyancy_time'] / total_time,
-                'avg_coupling_iterations': np.mean(self.performance_stats['coupling_iterations']) if self.performance_stats['coupling_iterations'] else 0,
-                'steps_per_second': self.performance_stats['total_steps'] / total_time if total_time > 0 else 0
+                'fluid_fraction': float(fractions[self._FLUID_TIME]),
+                'thermal_fraction': float(fractions[self._THERMAL_TIME]),
+                'property_fraction': float(fractions[self._PROPERTY_TIME]),
+                'buoyancy_fraction': float(fractions[self._BUOYANCY_TIME]),
+                'avg_coupling_iterations': self._iter_sum / self._iter_count if self._iter_count else 0,
+                'lifetime_avg_coupling_iterations': self._iter_total / self._total_steps if self._total_steps else 0,
+                'steps_per_second': self._timed_steps / total_time
             }
         
         # 穩定性統計
         diagnostics['stability'] = {
-            'temperature_changes': self.stability_history['temperature_changes'][-10:],  # 最近10步
-            'velocity_magnitudes': self.stability_history['velocity_magnitudes'][-10:],
+            'temperature_changes': self._recent_stability('temperature_changes', 10),  # 最近10步
+            'velocity_magnitudes': self._recent_stability('velocity_magnitudes', 10),
             'max_temperature_change': self.config.max_temperature_change,
             'max_velocity_magnitude': self.config.max_velocity_magnitude
         }
@@ -484,23 +581,38 @@ class StrongCoupledSolver:
             完整系統狀態數據
         """
         
+        # 每次保存配置新的host陣列 (呼叫端會保留多個狀態快照)，
+        # 再以單一kernel一次寫入所有場，取代逐場 to_numpy() 的多次同步
+        shape = (config.NX, config.NY, config.NZ)
+        velocity = np.empty(shape + (3,), dtype=np.float32)
+        density = np.empty(shape, dtype=np.float32)
+        pressure = np.empty(shape, dtype=np.float32)
+        temperature = np.empty(shape, dtype=np.float32)
+        heat_flux = np.empty(shape + (3,), dtype=np.float32)
+        fluid_density = np.empty(shape, dtype=np.float32)
+        viscosity = np.empty(shape, dtype=np.float32)
+        thermal_conductivity = np.empty(shape, dtype=np.float32)
+        self._export_coupled_state(self.fluid_solver.get_velocity_vector_field(),
+                                   velocity, density, pressure, temperature, heat_flux,
+                                   fluid_density, viscosity, thermal_conductivity)
+        
         state_data = {
             'step': step_num,
             'coupling_step': self.coupling_step,
             
             # 流體場
-            'velocity': self.fluid_solver.get_velocity_vector_field().to_numpy(),
-            'density': self.fluid_solver.rho.to_numpy(),
-            'pressure': self.fluid_solver.rho.to_numpy() * config.CS2,  # 近似壓力
+            'velocity': velocity,
+            'density': density,
+            'pressure': pressure,  # 近似壓力 p = ρc_s²
             
             # 溫度場
-            'temperature': self.thermal_solver.temperature.to_numpy(),
-            'heat_flux': self.thermal_solver.heat_flux.to_numpy(),
+            'temperature': temperature,
+            'heat_flux': heat_flux,
             
             # 物性場
-            'fluid_density': self.properties_calculator.density_field.to_numpy(),
-            'viscosity': self.properties_calculator.viscosity_field.to_numpy(),
-            'thermal_conductivity': self.properties_calculator.thermal_conductivity_field.to_numpy(),
+            'fluid_density': fluid_density,
+            'viscosity': viscosity,
+            'thermal_conductivity': thermal_conductivity,
         }
         
         # 浮力場 (如果可用)
@@ -510,6 +622,28 @@ class StrongCoupledSolver:
         
         return state_data
     
+    @ti.kernel
+    def _export_coupled_state(self, velocity_field: ti.template(),
+                              velocity: ti.types.ndarray(), density: ti.types.ndarray(),
+                              pressure: ti.types.ndarray(), temperature: ti.types.ndarray(),
+                              heat_flux: ti.types.ndarray(), fluid_density: ti.types.ndarray(),
+                              viscosity: ti.types.ndarray(), thermal_conductivity: ti.types.ndarray()):
+        """將流體、溫度與物性場一次寫入host陣列 (壓力於寫出時計算)"""
+        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
+            rho = self.fluid_solver.rho[i, j, k]
+            density[i, j, k] = rho
+            pressure[i, j, k] = rho * config.CS2
+            temperature[i, j, k] = self.thermal_solver.temperature[i, j, k]
+            fluid_density[i, j, k] = self.properties_calculator.density_field[i, j, k]
+            viscosity[i, j, k] = self.properties_calculator.viscosity_field[i, j, k]
+            thermal_conductivity[i, j, k] = self.properties_calculator.thermal_conductivity_field[i, j, k]
+            
+            u_local = velocity_field[i, j, k]
+            q_local = self.thermal_solver.heat_flux[i, j, k]
+            for d in ti.static(range(3)):
+                velocity[i, j, k, d] = u_local[d]
+                heat_flux[i, j, k, d] = q_local[d]
+    
     def reset_strong_coupling_system(self):
         """重置強耦合系統"""
         
@@ -528,23 +662,16 @@ class StrongCoupledSolver:
         self.is_initialized = False
         self.is_converged = False
         self.current_relaxation = self.config.relaxation_factor
+        self._last_residual = float('inf')
+        self._buoyancy_dirty = True
         
         # 重置統計
-        self.performance_stats = {
-            'fluid_time': 0.0,
-            'thermal_time': 0.0,
-            'property_update_time': 0.0,
-            'buoyancy_time': 0.0,
-            'coupling_iterations': [],
-            'total_steps': 0
-        }
+        self._perf_times[:] = 0.0
+        self._total_steps = 0
+        self._timed_steps = 0
+        self._reset_coupling_iteration_ring()
         
-        self.stability_history = {
-            'temperature_changes': [],
-            'velocity_magnitudes': [],
-            'coupling_residuals': [],
-            'rayleigh_numbers': []
-        }
+        self._reset_stability_history()
         
         print("✅ 強耦合系統重置完成")
 
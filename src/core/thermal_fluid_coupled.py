@@ -22,6 +22,7 @@ Phase 2: 熱流弱耦合系統
 
 import taichi as ti
 import numpy as np
+import math
 import time
 from typing import Tuple, Optional, Dict, Any
 from dataclasses import dataclass
@@ -38,6 +39,7 @@ class CouplingConfig:
     velocity_smoothing: bool = True  # 速度場平滑
     thermal_subcycles: int = 1       # 熱傳子循環數
     enable_diagnostics: bool = True  # 診斷監控
+    diagnostic_frequency: int = 50   # 穩定性檢查頻率 (每N步)
     max_coupling_error: float = 1e6  # 最大耦合誤差限制
 
 @ti.data_oriented
@@ -88,12 +90,7 @@ class ThermalFluidCoupledSolver:
         # 耦合狀態
         self.coupling_step = 0
         self.is_initialized = False
-        self.performance_stats = {
-            'fluid_time': 0.0,
-            'thermal_time': 0.0,
-            'coupling_time': 0.0,
-            'total_steps': 0
-        }
+        self._reset_performance_counters()
         
         print("✅ 熱流弱耦合系統初始化完成")
     
@@ -157,57 +154,80 @@ class ThermalFluidCoupledSolver:
             print("❌ 錯誤：耦合系統未初始化")
             return False
         
-        step_start_time = time.time()
-        
-        # 1. 流體LBM步驟
-        fluid_start = time.time()
+        # 例外僅於整步外層捕捉一次
         try:
-            self.fluid_solver.step()  # LBM solver step() 不返回布爾值
-            fluid_success = True
+            return self._run_coupled_step()
         except Exception as e:
-            print(f"❌ 流體求解器異常: {e}")
-            fluid_success = False
-            
-        if not fluid_success:
-            print(f"❌ 步驟{self.coupling_step}: 流體求解器失敗")
+            print(f"❌ 步驟{self.coupling_step}: 耦合步驟異常: {e}")
             return False
-        self.performance_stats['fluid_time'] += time.time() - fluid_start
+    
+    def _run_coupled_step(self) -> bool:
+        """耦合時間步主體 (流體、速度傳遞、熱傳與診斷)"""
+        
+        timing = self.coupling_config.enable_diagnostics
+        
+        # 1. 流體LBM步驟
+        if timing:
+            t0 = time.perf_counter_ns()
+        self.fluid_solver.step()  # LBM solver step() 不返回布爾值
+        if timing:
+            self._fluid_ns += time.perf_counter_ns() - t0
         
         # 2. 速度場傳遞 (按耦合頻率)
         if self.coupling_step % self.coupling_config.coupling_frequency == 0:
-            coupling_start = time.time()
+            if timing:
+                t0 = time.perf_counter_ns()
             success = self._update_thermal_velocity_coupling()
             if not success:
                 print(f"❌ 步驟{self.coupling_step}: 速度場耦合失敗")
                 return False
-            self.performance_stats['coupling_time'] += time.time() - coupling_start
+            if timing:
+                self._coupling_ns += time.perf_counter_ns() - t0
         
         # 3. 熱傳LBM步驟
-        thermal_start = time.time()
-        
-        # 重置熱源場到基礎值
-        self.thermal_solver.reset_heat_source_to_base(self.base_heat_source)
+        if timing:
+            t0 = time.perf_counter_ns()
         
-        # 執行熱傳子循環
+        # 執行熱傳子循環 (首個子循環以基礎熱源重設熱源場，與對流項同一次掃描)
         for subcycle in range(self.coupling_config.thermal_subcycles):
-            thermal_success = self.thermal_solver.step()
+            base_heat_source = self.base_heat_source if subcycle == 0 else None
+            thermal_success = self.thermal_solver.step(base_heat_source)
             if not thermal_success:
                 print(f"❌ 步驟{self.coupling_step}.{subcycle}: 熱傳求解器失敗")
                 return False
         
-        self.performance_stats['thermal_time'] += time.time() - thermal_start
+        if timing:
+            self._thermal_ns += time.perf_counter_ns() - t0
         
-        # 4. 診斷檢查
-        if self.coupling_config.enable_diagnostics:
+        # 4. 診斷檢查 (溫度漂移於多步間累積，按頻率抽檢)
+        if (self.coupling_config.enable_diagnostics and
+                self.coupling_step % self.coupling_config.diagnostic_frequency == 0):
             if not self._check_coupling_stability():
                 print(f"❌ 步驟{self.coupling_step}: 耦合穩定性檢查失敗")
                 return False
         
         self.coupling_step += 1
-        self.performance_stats['total_steps'] += 1
+        self._total_steps += 1
         
         return True
     
+    def _reset_performance_counters(self):
+        """清零各階段耗時計數 (整數奈秒) 與步數"""
+        self._fluid_ns = 0
+        self._thermal_ns = 0
+        self._coupling_ns = 0
+        self._total_steps = 0
+    
+    @property
+    def performance_stats(self) -> Dict[str, Any]:
+        """性能統計字典 (相容舊介面，耗時以秒表示)"""
+        return {
+            'fluid_time': self._fluid_ns * 1e-9,
+            'thermal_time': self._thermal_ns * 1e-9,
+            'coupling_time': self._coupling_ns * 1e-9,
+            'total_steps': self._total_steps
+        }
+    
     def _update_thermal_velocity_coupling(self) -> bool:
         """
         更新熱傳求解器的速度場耦合
@@ -216,23 +236,18 @@ class ThermalFluidCoupledSolver:
             True: 成功, False: 失敗
         """
         
-        try:
-            # 獲取流體速度場
-            velocity_field = self.fluid_solver.get_velocity_field_for_thermal_coupling()
-            
-            # 可選的速度場平滑
-            if self.coupling_config.velocity_smoothing:
-                # 可實現簡單的空間平滑算法
-                pass
-            
-            # 傳遞到熱傳求解器
-            self.thermal_solver.set_velocity_field(velocity_field)
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ 速度場耦合錯誤: {e}")
-            return False
+        # 獲取流體速度場
+        velocity_field = self.fluid_solver.get_velocity_field_for_thermal_coupling()
+        
+        # 可選的速度場平滑
+        if self.coupling_config.velocity_smoothing:
+            # 可實現簡單的空間平滑算法
+            pass
+        
+        # 傳遞到熱傳求解器
+        self.thermal_solver.set_velocity_field(velocity_field)
+        
+        return True
     
     def _check_coupling_stability(self) -> bool:
         """
@@ -253,10 +268,10 @@ class ThermalFluidCoupledSolver:
             print(f"⚠️  溫度梯度過大: {abs(T_max - T_min):.1f}°C")
             return False
         
-        # 檢查速度場量級
-        velocity_magnitude = self.fluid_solver.get_velocity_magnitude()
-        if np.any(velocity_magnitude > 1.0):  # 格子單位
-            print(f"⚠️  速度場量級過大: max={np.max(velocity_magnitude):.3f}")
+        # 檢查速度場量級 (裝置端求 max|u|²，僅回傳純量)
+        max_vel = math.sqrt(self.fluid_solver.max_velocity_squared())
+        if max_vel > 1.0:  # 格子單位
+            print(f"⚠️  速度場量級過大: max={max_vel:.3f}")
             return False
         
         return True
@@ -269,16 +284,15 @@ class ThermalFluidCoupledSolver:
             診斷資訊字典
         """
         
-        if self.performance_stats['total_steps'] == 0:
+        if self._total_steps == 0:
             return {'status': 'not_started'}
         
         # 溫度統計
         T_min, T_max, T_avg = self.thermal_solver.get_temperature_stats()
         
-        # 性能統計
-        total_time = (self.performance_stats['fluid_time'] + 
-                     self.performance_stats['thermal_time'] + 
-                     self.performance_stats['coupling_time'])
+        # 性能統計 (奈秒計數於此換算為秒)
+        stats = self.performance_stats
+        total_time = stats['fluid_time'] + stats['thermal_time'] + stats['coupling_time']
         
         diagnostics = {
             'coupling_step': self.coupling_step,
@@ -289,10 +303,10 @@ class ThermalFluidCoupledSolver:
                 'thermal_diffusivity': self.thermal_solver.get_effective_thermal_diffusivity()
             },
             'performance': {
-                'fluid_fraction': self.performance_stats['fluid_time'] / total_time if total_time > 0 else 0,
-                'thermal_fraction': self.performance_stats['thermal_time'] / total_time if total_time > 0 else 0,
-                'coupling_fraction': self.performance_stats['coupling_time'] / total_time if total_time > 0 else 0,
-                'steps_per_second': self.performance_stats['total_steps'] / total_time if total_time > 0 else 0
+                'fluid_fraction': stats['fluid_time'] / total_time if total_time > 0 else 0,
+                'thermal_fraction': stats['thermal_time'] / total_time if total_time > 0 else 0,
+                'coupling_fraction': stats['coupling_time'] / total_time if total_time > 0 else 0,
+                'steps_per_second': stats['total_steps'] / total_time if total_time > 0 else 0
             },
             'coupling_config': {
                 'frequency': self.coupling_config.coupling_frequency,
@@ -314,24 +328,41 @@ class ThermalFluidCoupledSolver:
             系統狀態數據
         """
         
-        # 獲取流體狀態
-        velocity_field = self.fluid_solver.get_velocity_vector_field()
-        density_field = self.fluid_solver.rho
-        
-        # 獲取熱傳狀態
-        temperature_field = self.thermal_solver.temperature
-        heat_flux_field = self.thermal_solver.heat_flux
+        # 每次保存配置新的host陣列 (呼叫端會保留多個狀態快照)，
+        # 再以單一kernel一次寫入所有場，取代逐場 to_numpy() 的多次同步
+        shape = (config.NX, config.NY, config.NZ)
+        velocity = np.empty(shape + (3,), dtype=np.float32)
+        density = np.empty(shape, dtype=np.float32)
+        temperature = np.empty(shape, dtype=np.float32)
+        heat_flux = np.empty(shape + (3,), dtype=np.float32)
+        self._export_coupling_state(self.fluid_solver.get_velocity_vector_field(),
+                                    velocity, density, temperature, heat_flux)
         
         state_data = {
             'step': step_num,
-            'velocity': velocity_field.to_numpy(),
-            'density': density_field.to_numpy(),
-            'temperature': temperature_field.to_numpy(),
-            'heat_flux': heat_flux_field.to_numpy()
+            'velocity': velocity,
+            'density': density,
+            'temperature': temperature,
+            'heat_flux': heat_flux
         }
         
         return state_data
     
+    @ti.kernel
+    def _export_coupling_state(self, velocity_field: ti.template(),
+                               velocity: ti.types.ndarray(), density: ti.types.ndarray(),
+                               temperature: ti.types.ndarray(), heat_flux: ti.types.ndarray()):
+        """將流體與溫度場一次寫入host陣列"""
+        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
+            density[i, j, k] = self.fluid_solver.rho[i, j, k]
+            temperature[i, j, k] = self.thermal_solver.temperature[i, j, k]
+            
+            u_local = velocity_field[i, j, k]
+            q_local = self.thermal_solver.heat_flux[i, j, k]
+            for d in ti.static(range(3)):
+                velocity[i, j, k, d] = u_local[d]
+                heat_flux[i, j, k, d] = q_local[d]
+    
     def reset_coupling_system(self):
         """重置耦合系統"""
         
@@ -344,12 +375,7 @@ class ThermalFluidCoupledSolver:
         # 重置狀態
         self.coupling_step = 0
         self.is_initialized = False
-        self.performance_stats = {
-            'fluid_time': 0.0,
-            'thermal_time': 0.0, 
-            'coupling_time': 0.0,
-            'total_steps': 0
-        }
+        self._reset_performance_counters()
         
         print("✅ 耦合系統重置完成")
     
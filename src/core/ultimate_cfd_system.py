@@ -6,6 +6,7 @@ SoA + JAX + Apple Silicon + 記憶體優化的完美結合
 
 import taichi as ti
 import numpy as np
+import functools
 import sys
 import os
 
@@ -24,6 +25,45 @@ from jax_hybrid_core import get_hybrid_core
 from src.core.memory_optimizer import get_memory_optimizer
 from src.core.apple_silicon_optimizations import apply_apple_silicon_optimizations
 
+@functools.lru_cache(maxsize=None)
+def _detect_hardware_platform() -> str:
+    """
+    檢測硬體平台
+    
+    優先以檔案/平台資訊判斷，僅於無法判定時才啟動子行程；
+    結果快取，重複建構系統時不再重新偵測
+    """
+    import platform
+    import subprocess
+    
+    system = platform.system().lower()
+    if system == "darwin":  # macOS
+        # Apple Silicon 回報 arm64 (Rosetta 下則需查詢CPU品牌)
+        if platform.machine() == "arm64":
+            return "apple_silicon"
+        try:
+            result = subprocess.run(['sysctl', '-n', 'machdep.cpu.brand_string'], 
+                                  capture_output=True, text=True)
+            if 'Apple' in result.stdout:
+                return "apple_silicon"
+            else:
+                return "intel_mac"
+        except:
+            return "intel_mac"
+    elif system == "linux":
+        # 檢查NVIDIA GPU (驅動已載入時存在此檔，免啟動 nvidia-smi)
+        if os.path.exists('/proc/driver/nvidia/version'):
+            return "nvidia_gpu"
+        try:
+            result = subprocess.run(['nvidia-smi'], capture_output=True)
+            if result.returncode == 0:
+                return "nvidia_gpu"
+        except:
+            pass
+        return "linux_cpu"
+    else:
+        return "unknown"
+
 @ti.data_oriented
 class UltimateV60CFDSystem:
     """
@@ -88,33 +128,8 @@ class UltimateV60CFDSystem:
         self._print_optimization_summary()
     
     def _detect_hardware_platform(self) -> str:
-        """檢測硬體平台"""
-        import platform
-        import subprocess
-        
-        system = platform.system().lower()
-        if system == "darwin":  # macOS
-            try:
-                # 檢查是否為Apple Silicon
-                result = subprocess.run(['sysctl', '-n', 'machdep.cpu.brand_string'], 
-                                      capture_output=True, text=True)
-                if 'Apple' in result.stdout:
-                    return "apple_silicon"
-                else:
-                    return "intel_mac"
-            except:
-                return "intel_mac"
-        elif system == "linux":
-            # 檢查NVIDIA GPU
-            try:
-                result = subprocess.run(['nvidia-smi'], capture_output=True)
-                if result.returncode == 0:
-                    return "nvidia_gpu"
-            except:
-                pass
-            return "linux_cpu"
-        else:
-            return "unknown"
+        """檢測硬體平台 (結果於行程內快取)"""
+        return _detect_hardware_platform()
     
     def _init_taichi_for_platform(self):
         """根據硬體平台初始化Taichi"""
@@ -185,6 +200,8 @@ class UltimateV60CFDSystem:
         # 精密注水系統
         from src.physics.precise_pouring import PrecisePouringSystem
         self.pouring = PrecisePouringSystem()
+        # 啟動注水 (與main.py相同採中心注水)；未啟動時注水kernel皆不作用
+        self.pouring.start_pouring(pattern='center')
         
         print("    ✅ 系統組件初始化完成")
     
@@ -229,41 +246,21 @@ class UltimateV60CFDSystem:
         # 3. 顆粒系統更新
         self.particles.update_particles(config.SCALE_TIME)
         
-        # 4. 注水系統控制
+        # 4. 注水系統控制 (以體力與相場注入，與速度場SoA/AoS佈局無關，無需暫存速度場)
         current_step = self.performance_stats['steps_completed']
-        if current_step < config.POURING_STEPS:
-            # 為SoA求解器創建臨時Vector速度場
-            if hasattr(self.lbm_solver, 'ux'):  # SoA版本
-                # 使用SoA求解器的內建Vector場轉換
-                temp_u = ti.Vector.field(3, dtype=ti.f32, shape=(config.NX, config.NY, config.NZ))
-                
-                @ti.kernel
-                def sync_soa_to_vector():
-                    for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-                        temp_u[i, j, k] = ti.Vector([
-                            self.lbm_solver.ux[i, j, k],
-                            self.lbm_solver.uy[i, j, k], 
-                            self.lbm_solver.uz[i, j, k]
-                        ])
-                
-                @ti.kernel 
-                def sync_vector_to_soa():
-                    for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-                        self.lbm_solver.ux[i, j, k] = temp_u[i, j, k][0]
-                        self.lbm_solver.uy[i, j, k] = temp_u[i, j, k][1]
-                        self.lbm_solver.uz[i, j, k] = temp_u[i, j, k][2]
-                
-                sync_soa_to_vector()
-                self.pouring.apply_pouring(
-                    temp_u, self.lbm_solver.rho, 
-                    self.multiphase.phi, current_step * config.SCALE_TIME
+        if hasattr(self.lbm_solver, 'body_force'):
+            # 注水體力作用於下一次LBM步驟：每步先清零，避免跨步累加及注水結束後殘留
+            if hasattr(self.lbm_solver, 'clear_body_force'):
+                self.lbm_solver.clear_body_force()
+            if current_step < config.POURING_STEPS:
+                self.pouring.apply_pouring_force(
+                    self.lbm_solver.body_force, self.lbm_solver.solid, config.DT
                 )
-                sync_vector_to_soa()
-            else:  # 標準版本
-                self.pouring.apply_pouring(
-                    self.lbm_solver.u, self.lbm_solver.rho,
-                    self.multiphase.phi, current_step * config.SCALE_TIME
+                self.pouring.apply_gradual_phase_change(
+                    self.multiphase.phi, self.lbm_solver.solid, config.DT
                 )
+            elif current_step == config.POURING_STEPS:
+                self.pouring.stop_pouring()
         
         # 5. 性能統計更新
         step_time = time.time() - step_start_time
@@ -219,33 +219,49 @@ class BuoyancyNaturalConvection:
             
             # Guo forcing項 (修正版)
             for q in ti.static(range(config.Q_3D)):  # 使用config.Q_3D確保一致性
-                # 離散速度 e_q (從傳入參數獲取)
+                # 離散速度 e_q 與權重 (從傳入參數獲取)
                 e_q = ti.Vector([cx[q], cy[q], cz[q]], ti.f32)
                 
-                # 權重 (從傳入參數獲取)
-                w_q = w[q]
-                
-                # Guo forcing係數 (使用正確鬆弛時間)
-                tau = config.TAU_WATER  # 水相鬆弛時間
-                guo_coeff = w_q * (1.0 - 1.0/(2.0 * tau))
-                
-                # 速度相關項
-                e_dot_u = e_q.dot(u)
-                e_dot_F = e_q.dot(F_b)
-                
-                # 修正的Guo forcing項計算
-                # S_q = w_q * (1 - 1/2τ) * [e_q·F/cs² + (e_q·u)(e_q·F)/cs⁴]
-                cs2_inv = config.INV_CS2  # 1/cs² = 3.0
-                term1 = e_dot_F * cs2_inv
-                term2 = e_dot_u * e_dot_F * cs2_inv * cs2_inv
-                
-                S_q = guo_coeff * (term1 + term2)
-                
-                # 數值穩定性限制
-                S_q = ti.max(-0.01, ti.min(0.01, S_q))
-                
                 # 應用forcing到分布函數 (SoA格式)
-                f_new_field[q, i, j, k] += config.DT * S_q
+                f_new_field[q, i, j, k] += self.buoyancy_source(e_q, w[q], u, F_b)
+    
+    @ti.func
+    def buoyancy_source(self, e_q, w_q, u, F_b):
+        """
+        單一方向的浮力Guo forcing源項 Δt·S_q
+        
+        供 apply_buoyancy_to_distribution 及LBM求解器的融合collision kernel共用，
+        使兩條路徑的浮力離散完全一致。
+        
+        Args:
+            e_q: 離散速度向量
+            w_q: 權重
+            u: 局部速度
+            F_b: 局部浮力
+            
+        Returns:
+            ti.f32: 分布函數增量 Δt·S_q
+        """
+        # Guo forcing係數 (使用正確鬆弛時間)
+        tau = config.TAU_WATER  # 水相鬆弛時間
+        guo_coeff = w_q * (1.0 - 1.0/(2.0 * tau))
+        
+        # 速度相關項
+        e_dot_u = e_q.dot(u)
+        e_dot_F = e_q.dot(F_b)
+        
+        # 修正的Guo forcing項計算
+        # S_q = w_q * (1 - 1/2τ) * [e_q·F/cs² + (e_q·u)(e_q·F)/cs⁴]
+        cs2_inv = config.INV_CS2  # 1/cs² = 3.0
+        term1 = e_dot_F * cs2_inv
+        term2 = e_dot_u * e_dot_F * cs2_inv * cs2_inv
+        
+        S_q = guo_coeff * (term1 + term2)
+        
+        # 數值穩定性限制
+        S_q = ti.max(-0.01, ti.min(0.01, S_q))
+        
+        return config.DT * S_q
     
     @ti.kernel
     def compute_rayleigh_number(self, 
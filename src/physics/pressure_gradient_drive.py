@@ -252,7 +252,7 @@ class PressureGradientDrive:
                         force_term = force_term * (max_force_impact / force_term_magnitude)
                     
                     self.lbm.u[i, j, k] = current_u + force_term
-                    self.lbm.u_sq[i, j, k] = self.lbm.u[i, j, k].norm_sqr()
+                    self.lbm.u_sqr[i, j, k] = self.lbm.u[i, j, k].norm_sqr()
     
     def apply(self, step: int = 0):
         """在固定時序中被主控呼叫的純應用函數（統一走Guo forcing）"""
@@ -269,24 +269,49 @@ class TemperatureDependentProperties:
         """
         
         for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
-            T = temperature_field[i, j, k]
-            
-            # 計算所有物性
-            density = self.density_from_temperature(T)
-            viscosity = self.viscosity_from_temperature(T)
-            k_thermal = self.thermal_conductivity_from_temperature(T)
-            cp = self.heat_capacity_from_temperature(T)
-            
-            # 更新物性場
-            self.density_field[i, j, k] = density
-            self.viscosity_field[i, j, k] = viscosity
-            self.thermal_conductivity_field[i, j, k] = k_thermal
-            self.heat_capacity_field[i, j, k] = cp
-            
-            # 計算衍生量
-            self.relaxation_time_field[i, j, k] = self.relaxation_time_from_viscosity(viscosity, density)
-            self.thermal_diffusivity_field[i, j, k] = k_thermal / (density * cp)
-            self.buoyancy_factor_field[i, j, k] = self.buoyancy_factor_from_temperature(T)
+            self._update_cell_properties(temperature_field[i, j, k], i, j, k)
+    
+    @ti.kernel
+    def update_properties_and_density(self, temperature_field: ti.template(),
+                                      lbm_rho_field: ti.template()):
+        """
+        從溫度場更新所有物性場，並於同一迴圈將密度寫入LBM密度場
+        
+        取代「物性更新 + 獨立密度同步kernel」的兩次全場掃描。
+        
+        Args:
+            temperature_field: 溫度場 [NX×NY×NZ]
+            lbm_rho_field: LBM求解器密度場 [NX×NY×NZ]
+        """
+        
+        for i, j, k in ti.ndrange(config.NX, config.NY, config.NZ):
+            lbm_rho_field[i, j, k] = self._update_cell_properties(temperature_field[i, j, k], i, j, k)
+    
+    @ti.func
+    def _update_cell_properties(self, T: ti.f32, i: ti.i32, j: ti.i32, k: ti.i32) -> ti.f32:
+        """
+        更新單一格點的所有物性場
+        
+        Returns:
+            ti.f32: 該格點密度
+        """
+        # 計算所有物性
+        density = self.density_from_temperature(T)
+        viscosity = self.viscosity_from_temperature(T)
+        k_thermal = self.thermal_conductivity_from_temperature(T)
+        cp = self.heat_capacity_from_temperature(T)
+        
+        # 更新物性場
+        self.density_field[i, j, k] = density
+        self.viscosity_field[i, j, k] = viscosity
+        self.thermal_conductivity_field[i, j, k] = k_thermal
+        self.heat_capacity_field[i, j, k] = cp
+        
+        # 計算衍生量
+        self.relaxation_time_field[i, j, k] = self.relaxation_time_from_viscosity(viscosity, density)
+        self.thermal_diffusivity_field[i, j, k] = k_thermal / (density * cp)
+        self.buoyancy_factor_field[i, j, k] = self.buoyancy_factor_from_temperature(T)
+        return density
     
     def get_property_statistics(self) -> Dict[str, Dict[str, float]]:
         """
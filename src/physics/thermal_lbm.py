@@ -127,6 +127,7 @@ class ThermalLBM:
         
         # 速度場接口 (用於對流耦合)
         self.velocity_field = ti.Vector.field(3, ti.f32, shape=(NX, NY, NZ))
+        self._velocity_source = self.velocity_field  # 對流核心讀取的速度場 (外部綁定時直接引用)
         self.enable_convection = False  # 控制是否啟用對流項
         
     @ti.kernel
@@ -393,10 +394,14 @@ class ThermalLBM:
         self.min_temperature[None] = T_min
         self.avg_temperature[None] = T_sum / (NX * NY * NZ)
     
-    def step(self) -> bool:
+    def step(self, base_heat_source=None) -> bool:
         """
         執行一個完整的LBM時間步 (含對流耦合)
         
+        Args:
+            base_heat_source: 基礎熱源場 (可選)；提供時先以其重設熱源場，
+                              並與對流項於同一次全場掃描中完成
+        
         Returns:
             True: 成功, False: 數值不穩定
         """
@@ -409,8 +414,13 @@ class ThermalLBM:
         self.temperature_old.copy_from(self.temperature)
         
         # 如果啟用對流，計算對流項
-        if self.enable_convection:
-            self.compute_convection_source_term()
+        if base_heat_source is not None:
+            if self.enable_convection:
+                self.compute_convection_source_from_base(base_heat_source, self._velocity_source)
+            else:
+                self.reset_heat_source_to_base(base_heat_source)
+        elif self.enable_convection:
+            self.compute_convection_source_term(self._velocity_source)
         
         # LBM步驟
         self.collision_step()
@@ -473,6 +483,7 @@ class ThermalLBM:
         self.temperature.fill(25.0)  # 環境溫度
         self.heat_source.fill(0.0)
         self.velocity_field.fill(0.0)  # 重置速度場
+        self._velocity_source = self.velocity_field
     
     # ==============================================
     # 對流耦合介面方法 (Phase 2)
@@ -495,47 +506,66 @@ class ThermalLBM:
         """
         設置流體速度場 (來自LBM求解器)
         
+        以引用方式綁定，對流核心直接讀取該場，不複製資料
+        
         Args:
             velocity_field: 3D向量速度場 [NX×NY×NZ×3]
         """
         if not self.enable_convection:
             return
             
-        # 複製速度場數據
-        self._copy_velocity_field(velocity_field)
+        self._velocity_source = velocity_field
     
-    @ti.kernel
-    def _copy_velocity_field(self, source_velocity: ti.template()):
+    @ti.func
+    def _convection_term(self, velocity: ti.template(), i: ti.i32, j: ti.i32, k: ti.i32) -> ti.f32:
         """
-        複製速度場數據到熱傳求解器
+        內部格點的對流項 -u·∇T (溫度梯度採中心差分)
         
-        Args:
-            source_velocity: 源速度場 (來自LBM求解器)
+        兩條對流源項路徑共用，確保計算一致
         """
-        for i, j, k in ti.ndrange(NX, NY, NZ):
-            self.velocity_field[i, j, k] = source_velocity[i, j, k]
+        dT_dx = (self.temperature[i+1, j, k] - self.temperature[i-1, j, k]) / (2.0 * DX)
+        dT_dy = (self.temperature[i, j+1, k] - self.temperature[i, j-1, k]) / (2.0 * DX)
+        dT_dz = (self.temperature[i, j, k+1] - self.temperature[i, j, k-1]) / (2.0 * DX)
+        
+        u_vec = velocity[i, j, k]
+        return -(u_vec.x * dT_dx + u_vec.y * dT_dy + u_vec.z * dT_dz)
     
     @ti.kernel 
-    def compute_convection_source_term(self):
+    def compute_convection_source_term(self, velocity: ti.template()):
         """
         計算對流項源項 S_conv = -u·∇T
         將結果疊加到熱源場中
+        
+        Args:
+            velocity: 速度場 [NX×NY×NZ×3]
         """
         
         for i in range(1, NX-1):
             for j in range(1, NY-1):
                 for k in range(1, NZ-1):
-                    # 溫度梯度 (中心差分)
-                    dT_dx = (self.temperature[i+1, j, k] - self.temperature[i-1, j, k]) / (2.0 * DX)
-                    dT_dy = (self.temperature[i, j+1, k] - self.temperature[i, j-1, k]) / (2.0 * DX)
-                    dT_dz = (self.temperature[i, j, k+1] - self.temperature[i, j, k-1]) / (2.0 * DX)
-                    
-                    # 對流項 -u·∇T
-                    u_vec = self.velocity_field[i, j, k]
-                    convection_term = -(u_vec.x * dT_dx + u_vec.y * dT_dy + u_vec.z * dT_dz)
-                    
                     # 疊加到熱源項
-                    self.heat_source[i, j, k] += convection_term
+                    self.heat_source[i, j, k] += self._convection_term(velocity, i, j, k)
+    
+    @ti.kernel
+    def compute_convection_source_from_base(self, base_heat_source: ti.template(),
+                                            velocity: ti.template()):
+        """
+        以基礎熱源重設熱源場並疊加對流項 S = S_base - u·∇T
+        
+        等同 reset_heat_source_to_base + compute_convection_source_term，
+        但只掃描一次熱源場
+        
+        Args:
+            base_heat_source: 基礎熱源場 (不含對流項)
+            velocity: 速度場 [NX×NY×NZ×3]
+        """
+        for i, j, k in ti.ndrange(NX, NY, NZ):
+            source = base_heat_source[i, j, k]
+            
+            if 0 < i < NX-1 and 0 < j < NY-1 and 0 < k < NZ-1:
+                source += self._convection_term(velocity, i, j, k)
+            
+            self.heat_source[i, j, k] = source
     
     @ti.kernel
     def reset_heat_source_to_base(self, base_heat_source: ti.template()):
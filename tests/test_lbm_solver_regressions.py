@@ -0,0 +1,186 @@
+# test_lbm_solver_regressions.py
+"""
+LBM求解器行為回歸測試
+於小網格驗證融合kernel、緩衝交換與體力場等優化後的行為不變
+
+開發：opencode + GitHub Copilot
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+import taichi as ti
+import config as config
+import config.core
+
+from src.core.lbm_solver import LBMSolver
+
+TEST_GRID = 16  # 小網格快速測試
+_original_grid = {}
+
+
+def setUpModule():
+    """縮小網格並初始化Taichi (CPU)"""
+    for mod in (config, config.core):
+        _original_grid[mod] = (mod.NX, mod.NY, mod.NZ)
+        mod.NX = mod.NY = mod.NZ = TEST_GRID
+    ti.init(arch=ti.cpu, debug=False)
+
+
+def tearDownModule():
+    """還原網格設定"""
+    for mod, (nx, ny, nz) in _original_grid.items():
+        mod.NX, mod.NY, mod.NZ = nx, ny, nz
+
+
+class TestBodyForce(unittest.TestCase):
+    """聚合體力場清零與診斷"""
+
+    def setUp(self):
+        self.solver = LBMSolver()
+        self.solver.init_fields()
+
+    def _fill_body_force(self, value):
+        force = np.zeros((TEST_GRID, TEST_GRID, TEST_GRID, 3), dtype=np.float32)
+        force[..., 2] = value
+        self.solver.body_force.from_numpy(force)
+
+    def test_clear_body_force_always_clears(self):
+        """clear_body_force 不論前一步為何皆清零"""
+        self._fill_body_force(-1e-5)
+        self.solver.step()
+        self._fill_body_force(-2e-5)
+        self.solver.clear_body_force()
+        self.assertEqual(np.abs(self.solver.body_force.to_numpy()).max(), 0.0)
+
+    def test_body_force_survives_step_for_diagnostics(self):
+        """step() 不消耗體力場，步後診斷仍可讀取本步體力"""
+        self._fill_body_force(-1e-5)
+        self.solver.step()
+        diagnostics = self.solver.get_coupling_diagnostics()
+        self.assertAlmostEqual(diagnostics['body_force_magnitude'], 1e-5, places=9)
+
+
+class TestFusedCollisionStreaming(unittest.TestCase):
+    """融合pull-streaming步進的靜止態與質量守恆"""
+
+    STEPS = 10
+
+    def setUp(self):
+        self.solver = LBMSolver()
+        self.solver.init_fields()
+
+    def test_uniform_equilibrium_stays_at_rest(self):
+        """均勻平衡態 (rho=1, u=0) 步進後維持靜止"""
+        for _ in range(self.STEPS):
+            self.solver.step()
+        u = self.solver.u.to_numpy()
+        rho = self.solver.rho.to_numpy()
+        self.assertLess(np.abs(u).max(), 1e-6)
+        np.testing.assert_allclose(rho, 1.0, atol=1e-5)
+
+    def test_mass_conserved_with_solids(self):
+        """含內部固體與擾動時，融合步進 (halfway bounce-back) 守恆總質量"""
+        solid = np.zeros((TEST_GRID, TEST_GRID, TEST_GRID), dtype=np.uint8)
+        solid[6:10, 6:10, 6:10] = 1
+        self.solver.solid.from_numpy(solid)
+
+        # 以擾動分布函數產生非平凡流動
+        rng = np.random.default_rng(0)
+        f = self.solver.f.to_numpy()
+        f *= 1.0 + 0.01 * rng.standard_normal(f.shape).astype(np.float32)
+        self.solver.f.from_numpy(f)
+
+        fluid = solid == 0
+        mass0 = self.solver.f.to_numpy().sum(axis=0)[fluid].sum(dtype=np.float64)
+        for _ in range(self.STEPS):
+            # 僅驗證融合kernel本身，排除出口等開放邊界的質量通量
+            self.solver._collision_streaming_step()
+        mass = self.solver.f.to_numpy().sum(axis=0)[fluid].sum(dtype=np.float64)
+        self.assertAlmostEqual(mass / mass0, 1.0, places=5)
+
+
+class TestResetSolver(unittest.TestCase):
+    """reset_solver() 的重置語意"""
+
+    def test_reset_restores_rest_equilibrium(self):
+        """重置後 f/f_new 為靜止平衡態，巨觀量、相場與固體標記皆清除"""
+        solver = LBMSolver()
+        solver.init_fields()
+        solid = np.zeros((TEST_GRID, TEST_GRID, TEST_GRID), dtype=np.uint8)
+        solid[4:8, 4:8, 4:8] = 1
+        solver.solid.from_numpy(solid)
+        solver.phase.fill(1.0)
+        solver.u_sqr.fill(0.5)
+        f = solver.f.to_numpy()
+        solver.f.from_numpy(f * 1.05)
+        solver.step()
+
+        solver.reset_solver()
+
+        weights = np.asarray(config.WEIGHTS_3D, dtype=np.float32).reshape(-1, 1, 1, 1)
+        for field in (solver.f, solver.f_new):
+            np.testing.assert_allclose(field.to_numpy(),
+                                       np.broadcast_to(weights, f.shape), atol=1e-7)
+        np.testing.assert_allclose(solver.rho.to_numpy(), 1.0)
+        self.assertEqual(np.abs(solver.u.to_numpy()).max(), 0.0)
+        self.assertEqual(solver.u_sqr.to_numpy().max(), 0.0)
+        self.assertEqual(np.abs(solver.phase.to_numpy()).max(), 0.0)
+        self.assertEqual(solver.solid.to_numpy().max(), 0)
+
+
+class TestMaxVelocitySquared(unittest.TestCase):
+    """耦合求解器共用的速度場最大 |u|² 歸約"""
+
+    def test_matches_numpy_reduction(self):
+        """裝置端歸約結果與numpy逐格計算一致"""
+        solver = LBMSolver()
+        solver.init_fields()
+        self.assertEqual(solver.max_velocity_squared(), 0.0)
+
+        rng = np.random.default_rng(1)
+        u = (0.05 * rng.standard_normal((TEST_GRID, TEST_GRID, TEST_GRID, 3))).astype(np.float32)
+        solver.u.from_numpy(u)
+        expected = float((u.astype(np.float64) ** 2).sum(axis=-1).max())
+        self.assertAlmostEqual(solver.max_velocity_squared(), expected, places=6)
+
+
+class TestTemperatureCouplingStep(unittest.TestCase):
+    """step_with_temperature_coupling 的失敗偵測"""
+
+    def setUp(self):
+        self.solver = LBMSolver()
+        self.solver.init_fields()
+
+    def test_valid_step_succeeds(self):
+        """正常步進回傳True"""
+        self.assertTrue(self.solver.step_with_temperature_coupling())
+
+    def test_nan_distribution_reports_failure(self):
+        """分布函數含NaN時，步進後巨觀量無效並回傳False"""
+        f = self.solver.f.to_numpy()
+        f[:, 8, 8, 8] = np.nan
+        self.solver.f.from_numpy(f)
+        self.assertFalse(self.solver.step_with_temperature_coupling())
+
+
+class TestMinimalAdapter(unittest.TestCase):
+    """main.MinimalAdapter 的分布函數轉發"""
+
+    def test_distribution_handles_follow_swap(self):
+        """求解器每步交換 f/f_new 參考，適配器須取得當前緩衝"""
+        from main import MinimalAdapter
+        solver = LBMSolver()
+        solver.init_fields()
+        adapter = MinimalAdapter(solver)
+        for _ in range(3):
+            solver.step()
+            self.assertIs(adapter.f, solver.f)
+            self.assertIs(adapter.f_new, solver.f_new)
+
+
+if __name__ == '__main__':
+    unittest.main()
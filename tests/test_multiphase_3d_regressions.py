@@ -0,0 +1,177 @@
+# test_multiphase_3d_regressions.py
+"""
+3D多相流模組行為回歸測試
+於小網格驗證相場更新、固體濕潤處理等優化後的行為
+
+開發：opencode + GitHub Copilot
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+from unittest import mock
+import numpy as np
+import taichi as ti
+import config as config
+import config.core
+
+from src.core.lbm_solver import LBMSolver
+from src.core.multiphase_3d import MultiphaseFlow3D
+
+TEST_GRID = 16  # 小網格快速測試
+_original_grid = {}
+
+
+def setUpModule():
+    """縮小網格並初始化Taichi (CPU)"""
+    for mod in (config, config.core):
+        _original_grid[mod] = (mod.NX, mod.NY, mod.NZ)
+        mod.NX = mod.NY = mod.NZ = TEST_GRID
+    ti.init(arch=ti.cpu, debug=False)
+
+
+def tearDownModule():
+    """還原網格設定"""
+    for mod, (nx, ny, nz) in _original_grid.items():
+        mod.NX, mod.NY, mod.NZ = nx, ny, nz
+
+
+def _tanh_interface(width=2.0):
+    """沿z方向的平面水-氣界面 φ = tanh((k - NZ/2) / W)"""
+    k = np.arange(TEST_GRID, dtype=np.float32) - 0.5 * TEST_GRID
+    profile = np.tanh(k / width).astype(np.float32)
+    return np.broadcast_to(profile, (TEST_GRID, TEST_GRID, TEST_GRID)).copy()
+
+
+def _tanh_droplet(radius=4.0, width=2.0):
+    """域中心的球形水滴 φ = tanh((R - r) / W)，曲率非零"""
+    axis = np.arange(TEST_GRID, dtype=np.float32) - 0.5 * TEST_GRID
+    x, y, z = np.meshgrid(axis, axis, axis, indexing='ij')
+    r = np.sqrt(x * x + y * y + z * z)
+    return np.tanh((radius - r) / width).astype(np.float32)
+
+
+class MultiphaseTestCase(unittest.TestCase):
+    """建立小網格LBM與多相流系統"""
+
+    def setUp(self):
+        self.lbm = LBMSolver()
+        self.lbm.init_fields()
+        self.multiphase = MultiphaseFlow3D(self.lbm)
+        self.multiphase.phi.from_numpy(_tanh_interface())
+
+    def _set_solid_block(self):
+        solid = np.zeros((TEST_GRID, TEST_GRID, TEST_GRID), dtype=np.uint8)
+        solid[4:8, 4:8, 6:10] = 1
+        self.lbm.solid.from_numpy(solid)
+        return solid == 1
+
+
+class TestSolidWetting(MultiphaseTestCase):
+    """固體格點的中性濕潤相場"""
+
+    def test_solid_cells_neutral_after_step(self):
+        """step() 後固體格點 φ=0，流體格點維持界面分布"""
+        solid = self._set_solid_block()
+        for step in range(3):
+            self.multiphase.step(step)
+        phi = self.multiphase.phi.to_numpy()
+        self.assertEqual(np.abs(phi[solid]).max(), 0.0)
+        self.assertGreater(np.abs(phi[~solid]).max(), 0.9)
+
+
+class TestInterfaceLayout(MultiphaseTestCase):
+    """界面局部場的稀疏/dense佈局"""
+
+    def _surface_force_after_step(self, multiphase):
+        multiphase.phi.from_numpy(_tanh_droplet())
+        multiphase.step(0)
+        return multiphase.surface_force.to_numpy()
+
+    def test_cpu_backend_uses_sparse_tiles(self):
+        """CPU後端且網格為16倍數時啟用16³區塊的pointer稀疏樹"""
+        self.assertTrue(self.multiphase.SPARSE_INTERFACE)
+        self.assertEqual(self.multiphase.INTERFACE_TILE, 16)
+        self.assertEqual(self.multiphase.interface_tiles.ptr.type, ti._lib.core.SNodeType.pointer)
+
+    def test_non_multiple_grid_falls_back_to_dense(self):
+        """網格邊長非16倍數時不退化為逐格點區塊，改用dense佈局"""
+        with mock.patch.object(config, 'NX', TEST_GRID + 2):
+            multiphase = MultiphaseFlow3D(self.lbm)
+        self.assertFalse(multiphase.SPARSE_INTERFACE)
+        self.assertEqual(multiphase.surface_force.shape, (TEST_GRID + 2, TEST_GRID, TEST_GRID))
+
+    def test_dense_fallback_matches_sparse(self):
+        """不支援pointer的後端改用dense佈局，表面張力結果與稀疏佈局一致"""
+        with mock.patch('src.core.multiphase_3d._sparse_snode_supported', return_value=False):
+            dense = MultiphaseFlow3D(self.lbm)
+        self.assertFalse(dense.SPARSE_INTERFACE)
+        self.assertEqual(dense.surface_force.shape, (TEST_GRID, TEST_GRID, TEST_GRID))
+
+        sparse_force = self._surface_force_after_step(self.multiphase)
+        self.assertGreater(np.abs(sparse_force).max(), 0.0)
+        np.testing.assert_allclose(self._surface_force_after_step(dense), sparse_force, atol=1e-7)
+
+
+class TestSpectralCahnHilliard(MultiphaseTestCase):
+    """半隱式譜方法Cahn-Hilliard路徑 (DCT-II)"""
+
+    STEPS = 5
+
+    def setUp(self):
+        super().setUp()
+        self.multiphase.phi.from_numpy(_tanh_droplet())
+        if not self.multiphase._spectral_available():
+            self.skipTest("scipy.fft不可用")
+
+    def _advance(self, spectral):
+        """僅推進Cahn-Hilliard更新 (不含相分離)，回傳最終相場"""
+        for _ in range(self.STEPS):
+            if spectral:
+                self.multiphase.update_phase_field_spectral()
+            else:
+                self.multiphase.compute_chemical_potential()
+                self.multiphase.update_phase_field_cahn_hilliard()
+            self.multiphase.swap_phase_fields()
+        return self.multiphase.phi.to_numpy()
+
+    def test_interface_stays_bounded(self):
+        """tanh界面演化後相場維持於[-1, 1]且無NaN"""
+        phi = self._advance(spectral=True)
+        self.assertTrue(np.all(np.isfinite(phi)))
+        self.assertLessEqual(np.abs(phi).max(), 1.0)
+
+    def test_mean_phase_conserved(self):
+        """零梯度邊界下譜方法守恆平均相場"""
+        mean0 = float(_tanh_droplet().mean(dtype=np.float64))
+        phi = self._advance(spectral=True)
+        self.assertAlmostEqual(float(phi.mean(dtype=np.float64)), mean0, places=5)
+
+    def test_matches_explicit_path(self):
+        """小步數下與顯式Euler路徑結果一致"""
+        phi0 = _tanh_droplet()
+        spectral = self._advance(spectral=True)
+        self.multiphase.phi.from_numpy(phi0)
+        explicit = self._advance(spectral=False)
+        change = np.abs(explicit - phi0).max()
+        self.assertGreater(change, 0.0)
+        self.assertLess(np.abs(spectral - explicit).max(), 0.05 * change)
+
+    def test_solid_mask_applied_after_spectral_update(self):
+        """譜算子不排除固體格點；step() 的相分離階段再將固體設為中性 φ=0"""
+        solid = self._set_solid_block()
+        self.multiphase.USE_SPECTRAL_CH = True
+        self.multiphase.update_phase_field_spectral()
+        self.assertGreater(np.abs(self.multiphase.phi_new.to_numpy()[solid]).max(), 0.0)
+
+        for step in range(3):
+            self.multiphase.step(step)
+        phi = self.multiphase.phi.to_numpy()
+        self.assertEqual(np.abs(phi[solid]).max(), 0.0)
+        self.assertLessEqual(np.abs(phi).max(), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
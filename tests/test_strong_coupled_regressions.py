@@ -0,0 +1,66 @@
+# test_strong_coupled_regressions.py
+"""
+熱-流強耦合求解器行為回歸測試
+於小網格驗證收斂殘差等優化後的行為
+
+開發：opencode + GitHub Copilot
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+import taichi as ti
+import config as config
+import config.core
+
+from src.core.strong_coupled_solver import StrongCoupledSolver, StrongCouplingConfig
+
+TEST_GRID = 16  # 小網格快速測試
+_original_grid = {}
+
+
+def setUpModule():
+    """縮小網格並初始化Taichi (CPU)"""
+    for mod in (config, config.core):
+        _original_grid[mod] = (mod.NX, mod.NY, mod.NZ)
+        mod.NX = mod.NY = mod.NZ = TEST_GRID
+    ti.init(arch=ti.cpu, debug=False)
+
+
+def tearDownModule():
+    """還原網格設定"""
+    for mod, (nx, ny, nz) in _original_grid.items():
+        mod.NX, mod.NY, mod.NZ = nx, ny, nz
+
+
+class TestCouplingResidual(unittest.TestCase):
+    """耦合收斂殘差 mean|T - T_prev|"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.solver = StrongCoupledSolver(StrongCouplingConfig(max_coupling_iterations=3))
+        cls.solver.initialize_coupled_system(
+            {}, {'T_initial': 25.0, 'T_hot_region': 85.0, 'hot_region_height': 4})
+
+    def test_residual_accumulates_in_f64(self):
+        """殘差累加器為f64，避免f32捨入改變收斂與物性沿用判斷"""
+        self.assertEqual(self.solver._residual.dtype, ti.f64)
+
+    def test_residual_matches_numpy(self):
+        """殘差與numpy以f64計算的平均溫度變化一致"""
+        solver = self.solver
+        solver._check_coupling_convergence()  # 建立 T_prev
+        T_prev = solver.thermal_solver.temperature.to_numpy().astype(np.float64)
+        solver.thermal_solver.step()
+        T = solver.thermal_solver.temperature.to_numpy().astype(np.float64)
+
+        expected = np.mean(np.abs(T - T_prev))
+        self.assertGreater(expected, 0.0)
+        self.assertAlmostEqual(solver._check_coupling_convergence() / expected, 1.0, places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# test_thermal_lbm_regressions.py
+"""
+熱傳LBM求解器行為回歸測試
+於小網格驗證對流源項等優化後的行為
+
+開發：opencode + GitHub Copilot
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import unittest
+import numpy as np
+import taichi as ti
+import config as config
+import config.core
+
+TEST_GRID = 16  # 小網格快速測試
+_original_grid = {}
+thermal_lbm = None
+
+
+def setUpModule():
+    """縮小網格並初始化Taichi (CPU)；thermal_lbm 於匯入時綁定網格尺寸，需於縮小後匯入"""
+    global thermal_lbm
+    for mod in (config, config.core):
+        _original_grid[mod] = (mod.NX, mod.NY, mod.NZ)
+        mod.NX = mod.NY = mod.NZ = TEST_GRID
+    ti.init(arch=ti.cpu, debug=False)
+    from src.physics import thermal_lbm
+
+
+def tearDownModule():
+    """還原網格設定"""
+    for mod, (nx, ny, nz) in _original_grid.items():
+        mod.NX, mod.NY, mod.NZ = nx, ny, nz
+
+
+class TestConvectionSource(unittest.TestCase):
+    """兩條對流源項路徑與 S = S_base - u·∇T 一致"""
+
+    def setUp(self):
+        if thermal_lbm.NX != TEST_GRID:
+            self.skipTest("thermal_lbm 已以其他網格尺寸匯入")
+        self.solver = thermal_lbm.ThermalLBM(thermal_diffusivity=1.6e-7)
+
+        rng = np.random.default_rng(0)
+        shape = (TEST_GRID, TEST_GRID, TEST_GRID)
+        self.T = (25.0 + 60.0 * rng.random(shape)).astype(np.float32)
+        self.u = (0.02 * (rng.random(shape + (3,)) - 0.5)).astype(np.float32)
+        self.base_np = rng.random(shape).astype(np.float32)
+
+        self.solver.temperature.from_numpy(self.T)
+        self.velocity = ti.Vector.field(3, dtype=ti.f32, shape=shape)
+        self.velocity.from_numpy(self.u)
+        self.base = ti.field(dtype=ti.f32, shape=shape)
+        self.base.from_numpy(self.base_np)
+
+    def _expected_source(self):
+        T = self.T.astype(np.float64)
+        inner = (slice(1, -1),) * 3
+        grad = [
+            (T[2:, 1:-1, 1:-1] - T[:-2, 1:-1, 1:-1]) / (2.0 * thermal_lbm.DX),
+            (T[1:-1, 2:, 1:-1] - T[1:-1, :-2, 1:-1]) / (2.0 * thermal_lbm.DX),
+            (T[1:-1, 1:-1, 2:] - T[1:-1, 1:-1, :-2]) / (2.0 * thermal_lbm.DX),
+        ]
+        u = self.u[inner].astype(np.float64)
+        expected = self.base_np.astype(np.float64)
+        expected[inner] -= u[..., 0] * grad[0] + u[..., 1] * grad[1] + u[..., 2] * grad[2]
+        return expected
+
+    def test_fused_path_matches_reference(self):
+        """compute_convection_source_from_base 單次掃描結果"""
+        self.solver.compute_convection_source_from_base(self.base, self.velocity)
+        np.testing.assert_allclose(self.solver.heat_source.to_numpy(), self._expected_source(),
+                                   rtol=1e-5, atol=1e-5)
+
+    def test_two_pass_path_matches_fused(self):
+        """reset_heat_source_to_base + compute_convection_source_term 與融合路徑一致"""
+        self.solver.compute_convection_source_from_base(self.base, self.velocity)
+        fused = self.solver.heat_source.to_numpy()
+        self.solver.reset_heat_source_to_base(self.base)
+        self.solver.compute_convection_source_term(self.velocity)
+        np.testing.assert_allclose(self.solver.heat_source.to_numpy(), fused, rtol=0, atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()